@@ -0,0 +1,746 @@
+"""
+A local stand-in for the parts of the GitHub API that `allprs` uses.
+
+Responses are built from the fixtures in `fixtures/` (minimal payloads that pass
+githubkit's validation), with the interesting fields filled in from a generated set
+of repositories and pull requests.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import ClassVar, cast, override
+from urllib.parse import parse_qs, urlsplit
+
+
+type Json = dict[str, object]
+
+FIXTURES = Path(__file__).parent / "fixtures"
+LOGIN = "me"
+AUTHORS = ["renovate[bot]", "pre-commit-ci[bot]", "dependabot[bot]"]
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def fixture(name: str) -> Json:
+    with (FIXTURES / f"{name}.json").open() as file:
+        data: Json = json.load(file)
+    return data
+
+
+@dataclass
+class FakePr:
+    owner: str
+    repo: str
+    number: int
+    title: str
+    author: str
+    head_ref: str
+    head_sha: str
+    diff: str
+    created_at: float
+    # Monotonic time at which the checks of the current head finish
+    checks_done_at: float
+    conclusion: str
+    state: str = "open"
+    # pre-commit.ci pushes a fix after the checks fail
+    fixable: bool = False
+    auto_merge: bool = False
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.repo}"
+
+
+@dataclass
+class Options:
+    prs: int = 50
+    # PRs with the same title form a title group
+    titles: int = 5
+    # PRs with the same title and diff variant form a diff group
+    diff_variants: int = 2
+    # Seconds added to every request
+    latency: float = 0.0
+    # Seconds added to every new connection, like a TLS handshake
+    connect_latency: float = 0.0
+    # Seconds that checks stay pending, drawn uniformly from this range
+    pending: tuple[float, float] = (0.0, 0.0)
+    # Fraction of PRs with failing checks
+    failure_rate: float = 0.0
+    # Fraction of failing PRs that get a fix pushed after the failure
+    fix_rate: float = 0.0
+    # Fraction of requests that fail with a 502
+    error_rate: float = 0.0
+    # Fraction of requests that hit the secondary rate limit
+    secondary_limit_rate: float = 0.0
+    # Number of repositories the PRs are spread over, 0 for one per PR
+    repos: int = 0
+    # Seconds a merge takes, merging into the same repo meanwhile fails with a 405
+    merge_time: float = 0.0
+    # Lines in each generated diff
+    diff_lines: int = 20
+    seed: int = 0
+
+
+class FakeGitHub:
+    def __init__(self, options: Options) -> None:
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.lock = threading.RLock()
+        self.calls: Counter[str] = Counter()
+        # Epoch time of the first call to each endpoint
+        self.first_call: dict[str, float] = {}
+        self.not_modified = 0
+        self.connections = 0
+        # Keyed by token and resource
+        self.used: Counter[tuple[str, str]] = Counter()
+        self.calls_per_token: Counter[str] = Counter()
+        self.reset = int(time.time()) + 3600
+        self.prs: dict[tuple[str, str, int], FakePr] = {}
+        self.templates = {
+            name: fixture(name)
+            for name in (
+                "check_run",
+                "combined_status",
+                "commit",
+                "issue_search_item",
+                "pull_request",
+                "repository",
+                "user",
+            )
+        }
+        now = time.time()
+        start = time.monotonic()
+        self.merging: set[tuple[str, str]] = set()
+        for i in range(options.prs):
+            repo_i = i % options.repos if options.repos else i
+            title_i = i % options.titles
+            variant = (i // options.titles) % options.diff_variants
+            pending = self.random.uniform(*options.pending)
+            pr = FakePr(
+                owner=LOGIN,
+                repo=f"repo-{repo_i}",
+                number=i // options.repos + 1 if options.repos else 1,
+                title=f"chore(deps): update dependency dep-{title_i} to v{title_i + 1}",
+                author=AUTHORS[title_i % len(AUTHORS)],
+                head_ref=f"renovate/dep-{title_i}-{i}",
+                head_sha=self.sha(f"{i}-0"),
+                diff=self.make_diff(f"repo-{repo_i}", title_i, variant),
+                created_at=now - (options.prs - i) * 3600,
+                checks_done_at=start + pending,
+                conclusion=(
+                    "failure"
+                    if self.random.random() < options.failure_rate
+                    else "success"
+                ),
+            )
+            pr.fixable = (
+                pr.conclusion == "failure" and self.random.random() < options.fix_rate
+            )
+            self.prs[pr.owner, pr.repo, pr.number] = pr
+
+    @staticmethod
+    def sha(seed: str) -> str:
+        return hashlib.sha1(seed.encode()).hexdigest()  # ruff:ignore[hashlib-insecure-hash-function]
+
+    def make_diff(self, repo: str, title_i: int, variant: int) -> str:
+        lines = [
+            "diff --git a/renovate.json b/renovate.json",
+            f"index {self.sha(repo)[:7]}..{self.sha(repo + "new")[:7]} 100644",
+            "--- a/renovate.json",
+            "+++ b/renovate.json",
+            f"@@ -1,{self.options.diff_lines} +1,{self.options.diff_lines} @@",
+        ]
+        for line in range(self.options.diff_lines):
+            lines.extend((
+                f"-dep-{title_i} line {line}",
+                f"+dep-{title_i} line {line} variant {variant}",
+            ))
+        return "\n".join(lines) + "\n"
+
+    # Helpers to build responses
+
+    def user(self, login: str) -> Json:
+        user = copy.deepcopy(self.templates["user"])
+        user["login"] = login
+        return user
+
+    def repository(self, owner: str, name: str) -> Json:
+        repo = copy.deepcopy(self.templates["repository"])
+        repo["name"] = name
+        repo["full_name"] = f"{owner}/{name}"
+        repo["owner"] = self.user(owner)
+        return repo
+
+    def pull_request(self, pr: FakePr) -> Json:
+        data = copy.deepcopy(self.templates["pull_request"])
+        base_repo = self.repository(pr.owner, pr.repo)
+        data.update(
+            number=pr.number,
+            title=pr.title,
+            state="open" if pr.state == "open" else "closed",
+            merged=pr.state == "merged",
+            auto_merge=(
+                {
+                    "enabled_by": self.user(LOGIN),
+                    "merge_method": "squash",
+                    "commit_title": None,
+                    "commit_message": None,
+                }
+                if pr.auto_merge and pr.state == "open"
+                else None
+            ),
+            url=f"/repos/{pr.full_name}/pulls/{pr.number}",
+            html_url=f"https://github.com/{pr.full_name}/pull/{pr.number}",
+            node_id=f"PR_{pr.full_name}#{pr.number}",
+            user=self.user(pr.author),
+            head={
+                "label": f"{pr.owner}:{pr.head_ref}",
+                "ref": pr.head_ref,
+                "sha": pr.head_sha,
+                "repo": base_repo,
+                "user": None,
+            },
+        )
+        base = data["base"]
+        assert isinstance(base, dict)
+        base["repo"] = base_repo
+        return data
+
+    def check_state(self, pr: FakePr) -> str:
+        if time.monotonic() < pr.checks_done_at:
+            return "pending"
+        conclusion = pr.conclusion
+        if pr.fixable:
+            # Report this failure, then push a commit that fixes it
+            pr.fixable = False
+            pr.head_sha = self.sha(pr.head_sha)
+            pr.diff += "+pre-commit fix\n"
+            pr.conclusion = "success"
+            pr.checks_done_at = time.monotonic() + 1
+            pr.updated_at = time.time()
+        return conclusion
+
+    def find_pr(self, owner: str, repo: str, number: str) -> FakePr | None:
+        pr = self.prs.get((owner, repo, int(number)))
+        if pr is not None:
+            self.settle(pr)
+        return pr
+
+    def settle(self, pr: FakePr) -> None:
+        # Auto-merge happens as soon as the checks pass
+        if pr.auto_merge and pr.state == "open" and self.check_state(pr) == "success":
+            pr.state = "merged"
+            pr.updated_at = time.time()
+
+    def search(self, query: str) -> list[FakePr]:
+        prs = list(self.prs.values())
+        for term in query.split():
+            key, _, value = term.partition(":")
+            if key == "author":
+                login = value.removeprefix("app/")
+                prs = [pr for pr in prs if pr.author.removesuffix("[bot]") == login]
+            elif key == "state":
+                prs = [pr for pr in prs if (pr.state == "open") == (value == "open")]
+            elif key == "repo":
+                prs = [pr for pr in prs if pr.full_name == value]
+            elif key in {"created", "updated"}:
+                prs = [pr for pr in prs if match_date(pr, key, value)]
+        prs.sort(key=lambda pr: pr.created_at, reverse=True)
+        return prs
+
+
+def match_date(pr: FakePr, key: str, value: str) -> bool:
+    stamp = pr.created_at if key == "created" else pr.updated_at
+    day = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(stamp))
+    if value.startswith(">="):
+        return day >= value[2:]
+    if value.startswith(">"):
+        return day > value[1:]
+    if value.startswith("<="):
+        return day <= value[2:]
+    if value.startswith("<"):
+        return day < value[1:]
+    if ".." in value:
+        low, high = value.split("..", maxsplit=1)
+        return (low == "*" or day >= low) and (high == "*" or day <= high)
+    return day.startswith(value)
+
+
+class Handler(BaseHTTPRequestHandler):  # ruff:ignore[too-many-public-methods]
+    protocol_version = "HTTP/1.1"
+    routes: ClassVar[list[tuple[str, re.Pattern[str], str, str]]] = []
+
+    def log_message(self, format: str, *args: object) -> None:  # ruff:ignore[builtin-argument-shadowing]
+        pass  # Keep benchmark output clean
+
+    @override
+    def setup(self) -> None:
+        # Once per connection, requests on a kept-alive connection don't get here
+        super().setup()
+        with self.gh.lock:
+            self.gh.connections += 1
+        if self.gh.options.connect_latency:
+            time.sleep(self.gh.options.connect_latency)
+
+    @property
+    def gh(self) -> FakeGitHub:
+        return cast("Server", self.server).gh
+
+    # Request plumbing
+
+    @property
+    def token(self) -> str:
+        return self.headers.get("Authorization", "").removeprefix("token ")
+
+    def handle_any(self, method: str) -> None:
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length", 0))
+        self.body = self.rfile.read(length) if length else b""
+        options = self.gh.options
+        if options.latency:
+            time.sleep(options.latency)
+        for route_method, pattern, endpoint, handler in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            with self.gh.lock:
+                self.gh.calls[endpoint] += 1
+                self.gh.calls_per_token[self.token] += 1
+                _ = self.gh.first_call.setdefault(endpoint, time.time())
+            if self.gh.random.random() < options.error_rate:
+                self.send_json({"message": "Server Error"}, status=502)
+                return
+            if self.gh.random.random() < options.secondary_limit_rate:
+                self.send_json(
+                    {"message": "You have exceeded a secondary rate limit."},
+                    status=403,
+                    headers={"Retry-After": "1"},
+                )
+                return
+            with self.gh.lock:
+                getattr(self, handler)(match)
+            return
+        self.send_json({"message": "Not Found"}, status=404)
+
+    def do_GET(self) -> None:
+        self.handle_any("GET")
+
+    def do_POST(self) -> None:
+        self.handle_any("POST")
+
+    def do_PUT(self) -> None:
+        self.handle_any("PUT")
+
+    def do_PATCH(self) -> None:
+        self.handle_any("PATCH")
+
+    def do_DELETE(self) -> None:
+        self.handle_any("DELETE")
+
+    def send_body(
+        self,
+        body: bytes,
+        content_type: str,
+        *,
+        status: int = 200,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+            self.gh.not_modified += 1
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept, Authorization")
+        self.send_header("Cache-Control", "private, max-age=60, s-maxage=60")
+        resource = (
+            "graphql"
+            if self.path == "/graphql"
+            else "search"
+            if self.path.startswith("/search/")
+            else "core"
+        )
+        limit = 30 if resource == "search" else 5000
+        with self.gh.lock:
+            self.gh.used[self.token, resource] += 1
+            remaining = max(0, limit - self.gh.used[self.token, resource])
+        self.send_header("X-RateLimit-Resource", resource)
+        self.send_header("X-RateLimit-Limit", str(limit))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset", str(self.gh.reset))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(
+        self,
+        data: object,
+        *,
+        status: int = 200,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.send_body(
+            json.dumps(data).encode(),
+            "application/json; charset=utf-8",
+            status=status,
+            headers=headers,
+        )
+
+    def send_page(
+        self, items: list[Json], key: str | None = None, **fields: object
+    ) -> None:
+        # Fields are added next to the key, if there is one
+        page = int(self.query.get("page", 1))
+        per_page = int(self.query.get("per_page", 30))
+        chunk = items[(page - 1) * per_page : page * per_page]
+        headers = {}
+        if page * per_page < len(items):
+            url = urlsplit(self.path)
+            query = dict(self.query, page=str(page + 1), per_page=str(per_page))
+            next_url = f"{url.path}?{"&".join(f"{k}={v}" for k, v in query.items())}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        if key is None:
+            self.send_json(chunk, headers=headers)
+        else:
+            self.send_json(
+                {
+                    "total_count": len(items),
+                    "incomplete_results": False,
+                    key: chunk,
+                    **fields,
+                },
+                headers=headers,
+            )
+
+    # Endpoints
+
+    def get_user(self, _match: re.Match[str]) -> None:
+        self.send_json(self.gh.user(LOGIN))
+
+    def search_issues(self, _match: re.Match[str]) -> None:
+        prs = self.gh.search(self.query.get("q", ""))
+        items = []
+        for pr in prs[:1000]:
+            item = copy.deepcopy(self.gh.templates["issue_search_item"])
+            item.update(
+                number=pr.number,
+                title=pr.title,
+                repository_url=f"/repos/{pr.full_name}",
+            )
+            items.append(item)
+        self.send_page(items, key="items", search_type="lexical")
+
+    def get_repo(self, match: re.Match[str]) -> None:
+        self.send_json(self.gh.repository(match["owner"], match["repo"]))
+
+    def get_pull(self, match: re.Match[str]) -> None:
+        pr = self.gh.find_pr(match["owner"], match["repo"], match["number"])
+        if pr is None:
+            self.send_json({"message": "Not Found"}, status=404)
+        elif "diff" in self.headers.get("Accept", ""):
+            self.send_body(pr.diff.encode(), "text/plain; charset=utf-8")
+        else:
+            self.send_json(self.gh.pull_request(pr))
+
+    def list_pulls(self, match: re.Match[str]) -> None:
+        head = self.query.get("head")
+        prs = [
+            self.gh.pull_request(pr)
+            for pr in self.gh.prs.values()
+            if pr.owner == match["owner"]
+            and pr.repo == match["repo"]
+            and pr.state == "open"
+            and (head is None or head == f"{pr.owner}:{pr.head_ref}")
+        ]
+        self.send_page(prs)
+
+    def list_commits(self, match: re.Match[str]) -> None:
+        pr = self.gh.find_pr(match["owner"], match["repo"], match["number"])
+        if pr is None:
+            self.send_json({"message": "Not Found"}, status=404)
+            return
+        commit = copy.deepcopy(self.gh.templates["commit"])
+        commit["sha"] = pr.head_sha
+        self.send_page([commit])
+
+    def merge_pull(self, match: re.Match[str]) -> None:
+        pr = self.gh.find_pr(match["owner"], match["repo"], match["number"])
+        if pr is None or pr.state != "open":
+            self.send_json({"message": "Pull Request is not mergeable"}, status=405)
+            return
+        sha = json.loads(self.body or b"{}").get("sha")
+        if sha is not None and sha != pr.head_sha:
+            self.send_json(
+                {
+                    "message": "Head branch was modified. "
+                    "Review and try the merge again."
+                },
+                status=409,
+            )
+            return
+        repo = (pr.owner, pr.repo)
+        if repo in self.gh.merging:
+            self.send_json(
+                {
+                    "message": "Base branch was modified. "
+                    "Review and try the merge again."
+                },
+                status=405,
+            )
+            return
+        if self.gh.options.merge_time:
+            self.gh.merging.add(repo)
+            self.gh.lock.release()
+            try:
+                time.sleep(self.gh.options.merge_time)
+            finally:
+                self.gh.lock.acquire()
+                self.gh.merging.discard(repo)
+        pr.state = "merged"
+        pr.updated_at = time.time()
+        self.send_json({"sha": pr.head_sha, "merged": True, "message": "Merged"})
+
+    def update_pull(self, match: re.Match[str]) -> None:
+        pr = self.gh.find_pr(match["owner"], match["repo"], match["number"])
+        if pr is None:
+            self.send_json({"message": "Not Found"}, status=404)
+            return
+        if json.loads(self.body or b"{}").get("state") == "closed":
+            pr.state = "closed"
+            pr.updated_at = time.time()
+        self.send_json(self.gh.pull_request(pr))
+
+    def create_review(self, _match: re.Match[str]) -> None:
+        self.send_json({"id": 1, "state": "APPROVED"})
+
+    def combined_status(self, match: re.Match[str]) -> None:
+        status = copy.deepcopy(self.gh.templates["combined_status"])
+        status.update(sha=match["ref"], state="pending", total_count=0)
+        self.send_json(status)
+
+    def check_runs(self, match: re.Match[str]) -> None:
+        runs = []
+        for pr in self.gh.prs.values():
+            if (pr.owner, pr.repo, pr.head_sha) != (
+                match["owner"],
+                match["repo"],
+                match["ref"],
+            ):
+                continue
+            run = copy.deepcopy(self.gh.templates["check_run"])
+            state = self.gh.check_state(pr)
+            run.update(
+                head_sha=pr.head_sha,
+                name="ci",
+                status="in_progress" if state == "pending" else "completed",
+                conclusion=None if state == "pending" else state,
+                html_url=f"https://github.com/{pr.full_name}/runs/1",
+            )
+            runs.append(run)
+        self.send_page(runs, key="check_runs")
+
+    def get_ref(self, match: re.Match[str]) -> None:
+        for pr in self.gh.prs.values():
+            if (pr.owner, pr.repo, pr.head_ref) == (
+                match["owner"],
+                match["repo"],
+                match["ref"],
+            ):
+                self.send_json({
+                    "ref": f"refs/heads/{pr.head_ref}",
+                    "node_id": "",
+                    "url": "",
+                    "object": {"type": "commit", "sha": pr.head_sha, "url": ""},
+                })
+                return
+        self.send_json({"message": "Not Found"}, status=404)
+
+    def delete_ref(self, _match: re.Match[str]) -> None:
+        self.send_body(b"", "application/json", status=204)
+
+    def graphql(self, _match: re.Match[str]) -> None:
+        request = json.loads(self.body)
+        query: str = request["query"]
+        variables: Json = request.get("variables") or {}
+        operation = re.search(r"(?:query|mutation)\s+(\w+)", query)
+        handler = getattr(self, f"graphql_{operation[1]}", None) if operation else None
+        if handler is None:
+            self.send_json({"errors": [{"message": "Unknown operation"}]})
+            return
+        try:
+            self.send_json({"data": handler(variables)})
+        except GraphQLError as err:
+            self.send_json({"data": None, "errors": [{"message": str(err)}]})
+
+    @staticmethod
+    def graphql_pr_node(pr: FakePr) -> Json:
+        repo = {"name": pr.repo, "owner": {"login": pr.owner}}
+        return {
+            "id": f"PR_{pr.full_name}#{pr.number}",
+            "number": pr.number,
+            "title": pr.title,
+            "url": f"https://github.com/{pr.full_name}/pull/{pr.number}",
+            "author": {"login": pr.author.removesuffix("[bot]")},
+            "repository": repo,
+            "headRefName": pr.head_ref,
+            "headRefOid": pr.head_sha,
+            "headRepository": repo,
+        }
+
+    def graphql_EnableAutoMerge(self, variables: Json) -> Json:  # ruff:ignore[invalid-function-name]
+        # Node ids are PR_{owner}/{repo}#{number}
+        full_name, number = str(variables["id"]).removeprefix("PR_").split("#")
+        owner, repo = full_name.split("/")
+        pr = self.gh.find_pr(owner, repo, number)
+        if pr is None or pr.state != "open":
+            msg = "Could not resolve to a PullRequest"
+            raise GraphQLError(msg)
+        if variables.get("sha") != pr.head_sha:
+            msg = "Head branch was modified. Review and try the merge again."
+            raise GraphQLError(msg)
+        if self.gh.check_state(pr) != "pending":
+            msg = "Pull request Pull request is in clean status"
+            raise GraphQLError(msg)
+        pr.auto_merge = True
+        return {"enablePullRequestAutoMerge": {"clientMutationId": None}}
+
+    def graphql_StatusRollup(self, variables: Json) -> Json:  # ruff:ignore[invalid-function-name]
+        # Fields head0, head1, ... with variables owner0, repo0, sha0, ...
+        data: Json = {}
+        i = 0
+        while f"sha{i}" in variables:
+            owner, repo, sha = (
+                variables[f"{key}{i}"] for key in ("owner", "repo", "sha")
+            )
+            commit = None
+            for pr in self.gh.prs.values():
+                if (pr.owner, pr.repo, pr.head_sha) != (owner, repo, sha):
+                    continue
+                state = self.gh.check_state(pr)
+                run = {
+                    "conclusion": None if state == "pending" else state.upper(),
+                    "url": f"https://github.com/{pr.full_name}/runs/1",
+                }
+                commit = {
+                    "statusCheckRollup": {
+                        "contexts": {
+                            "pageInfo": {"hasNextPage": False, "endCursor": None},
+                            "nodes": [run],
+                        }
+                    }
+                }
+            data[f"head{i}"] = {"object": commit}
+            i += 1
+        return data
+
+    def graphql_SearchPrs(self, variables: Json) -> Json:  # ruff:ignore[invalid-function-name]
+        prs = self.gh.search(str(variables["query"]))
+        start = int(str(variables.get("cursor") or 0))
+        first = 100
+        chunk = prs[start : start + first][: max(0, 1000 - start)]
+        end = start + len(chunk)
+        return {
+            "search": {
+                "issueCount": len(prs),
+                "pageInfo": {
+                    "hasNextPage": end < min(len(prs), 1000),
+                    "endCursor": str(end),
+                },
+                "nodes": [self.graphql_pr_node(pr) for pr in chunk],
+            }
+        }
+
+
+def route(method: str, path: str, endpoint: str, handler: str) -> None:
+    pattern = re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", path)
+    if path.endswith("{ref}"):
+        # Refs can contain slashes
+        pattern = pattern.removesuffix("[^/]+)") + ".+)"
+    Handler.routes.append((method, re.compile(pattern), endpoint, handler))
+
+
+route("GET", "/user", "GET /user", "get_user")
+route("GET", "/search/issues", "GET /search/issues", "search_issues")
+route("POST", "/graphql", "POST /graphql", "graphql")
+route("GET", "/repos/{owner}/{repo}", "GET /repos/{r}", "get_repo")
+route("GET", "/repos/{owner}/{repo}/pulls", "GET /pulls", "list_pulls")
+route("GET", "/repos/{owner}/{repo}/pulls/{number}", "GET /pulls/{n}", "get_pull")
+route(
+    "PATCH",
+    "/repos/{owner}/{repo}/pulls/{number}",
+    "PATCH /pulls/{n}",
+    "update_pull",
+)
+route(
+    "GET",
+    "/repos/{owner}/{repo}/pulls/{number}/commits",
+    "GET /pulls/{n}/commits",
+    "list_commits",
+)
+route(
+    "PUT",
+    "/repos/{owner}/{repo}/pulls/{number}/merge",
+    "PUT /pulls/{n}/merge",
+    "merge_pull",
+)
+route(
+    "POST",
+    "/repos/{owner}/{repo}/pulls/{number}/reviews",
+    "POST /pulls/{n}/reviews",
+    "create_review",
+)
+route(
+    "GET",
+    "/repos/{owner}/{repo}/commits/{ref}/status",
+    "GET /commits/{ref}/status",
+    "combined_status",
+)
+route(
+    "GET",
+    "/repos/{owner}/{repo}/commits/{ref}/check-runs",
+    "GET /commits/{ref}/check-runs",
+    "check_runs",
+)
+route("GET", "/repos/{owner}/{repo}/git/ref/heads/{ref}", "GET /git/ref", "get_ref")
+route(
+    "DELETE",
+    "/repos/{owner}/{repo}/git/refs/heads/{ref}",
+    "DELETE /git/refs",
+    "delete_ref",
+)
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, gh: FakeGitHub, port: int = 0) -> None:
+        self.gh = gh
+        super().__init__(("127.0.0.1", port), Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/"
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
@@ -0,0 +1,205 @@
+"""
+Run allprs against the fake GitHub API, and report how long it took.
+
+Usage: python benchmarks/run.py [--prs 5000] [--latency 0.05] ...
+
+allprs runs in a subprocess in --batch mode, with a temporary home directory, so
+it doesn't touch the real configuration, cache or GitHub.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fake_github import FakeGitHub, Options, Server
+
+
+class Args(argparse.Namespace):
+    prs: int
+    titles: int
+    repos: int
+    latency: float
+    connect_latency: float
+    pending: tuple[float, float]
+    failure_rate: float
+    error_rate: float
+    secondary_limit_rate: float
+    policy: str
+    auto_merge: bool
+    tokens: int
+    runs: int
+    json: bool
+
+
+def parse_args() -> Args:
+    parser = argparse.ArgumentParser("benchmarks/run.py")
+    parser.add_argument("--prs", type=int, default=50)
+    parser.add_argument("--titles", type=int, default=5)
+    parser.add_argument("--repos", type=int, default=0, help="0 for one per PR")
+    parser.add_argument("--latency", type=float, default=0.0, help="In seconds")
+    parser.add_argument(
+        "--connect-latency",
+        type=float,
+        default=0.0,
+        help="Seconds added to every new connection, like a TLS handshake",
+    )
+    parser.add_argument(
+        "--pending",
+        type=float,
+        nargs=2,
+        default=(0.0, 0.0),
+        metavar=("MIN", "MAX"),
+        help="Seconds that checks stay pending",
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--secondary-limit-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--policy",
+        choices=["accept", "skip"],
+        default="accept",
+        help="What to do with every diff group",
+    )
+    parser.add_argument(
+        "--auto-merge",
+        action="store_true",
+        help="Accept PRs with pending checks, enabling auto-merge",
+    )
+    parser.add_argument(
+        "--tokens",
+        type=int,
+        default=0,
+        help="Number of extra tokens in the configuration",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=1,
+        help="Runs with the same home directory, so later runs use the http cache",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args(namespace=Args())
+
+
+@dataclass
+class Result:
+    wall_time: float
+    # Until the first request reached the API
+    time_to_first_request: float | None
+    # Until the first diff group was decided on
+    time_to_first_diff_group: float | None
+    exit_code: int
+    calls: dict[str, int] = field(default_factory=dict)
+    calls_per_token: dict[str, int] = field(default_factory=dict)
+    not_modified: int = 0
+    connections: int = 0
+
+
+def run_once(server: Server, home: Path, args: Args) -> Result:
+    server.gh = FakeGitHub(
+        Options(
+            prs=args.prs,
+            titles=args.titles,
+            repos=args.repos,
+            latency=args.latency,
+            connect_latency=args.connect_latency,
+            pending=args.pending,
+            failure_rate=args.failure_rate,
+            error_rate=args.error_rate,
+            secondary_limit_rate=args.secondary_limit_rate,
+        )
+    )
+    report = home / "report.json"
+    env = {
+        "HOME": str(home),
+        "GH_TOKEN": "fake",
+        "PATH": os.environ.get("PATH", ""),
+    }
+    if "PYTHONPATH" in os.environ:
+        env["PYTHONPATH"] = os.environ["PYTHONPATH"]
+
+    start = time.time()
+    process = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        [sys.executable, "-m", "allprs", "--batch", "--report", str(report)],
+        env=env,
+        check=False,
+    )
+    wall_time = time.time() - start
+
+    time_to_first = None
+    if report.exists():
+        with report.open() as file:
+            data = json.load(file)
+        if data["decisions"]:
+            time_to_first = data["started"] + data["decisions"][0]["elapsed"] - start
+    first_call = min(server.gh.first_call.values(), default=None)
+    return Result(
+        wall_time=wall_time,
+        time_to_first_request=None if first_call is None else first_call - start,
+        time_to_first_diff_group=time_to_first,
+        exit_code=process.returncode,
+        calls=dict(sorted(server.gh.calls.items())),
+        calls_per_token=dict(sorted(server.gh.calls_per_token.items())),
+        not_modified=server.gh.not_modified,
+        connections=server.gh.connections,
+    )
+
+
+def print_result(i: int, result: Result) -> None:
+    print(f"Run {i + 1}")
+    print(f"  wall time:                {result.wall_time:8.2f} s")
+    if result.time_to_first_request is not None:
+        print(f"  time to first request:    {result.time_to_first_request:8.2f} s")
+    if result.time_to_first_diff_group is not None:
+        print(f"  time to first diff group: {result.time_to_first_diff_group:8.2f} s")
+    print(f"  exit code:                {result.exit_code:8}")
+    print(f"  API calls:                {sum(result.calls.values()):8}")
+    for endpoint, count in result.calls.items():
+        print(f"    {endpoint:32} {count:6}")
+    if len(result.calls_per_token) > 1:
+        print("  API calls per token:")
+        for token, count in result.calls_per_token.items():
+            print(f"    {token:32} {count:6}")
+    print(f"  304 responses:            {result.not_modified:8}")
+    print(f"  connections:              {result.connections:8}")
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp)
+        server = Server(FakeGitHub(Options(prs=0)))
+        server.start()
+        with (home / ".allprs.json").open("w") as file:
+            json.dump(
+                {
+                    "api_url": server.url,
+                    "policy": [{"action": args.policy}],
+                    "tokens": [f"fake-{i + 1}" for i in range(args.tokens)],
+                    "auto_merge": args.auto_merge,
+                },
+                file,
+            )
+
+        results = [run_once(server, home, args) for _ in range(args.runs)]
+        server.shutdown()
+
+    if args.json:
+        json.dump([result.__dict__ for result in results], sys.stdout, indent=4)
+        print()
+    else:
+        for i, result in enumerate(results):
+            print_result(i, result)
+    return max(result.exit_code for result in results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Measure how long allprs takes to start.
+
+Usage: python benchmarks/startup.py [--runs 5] [--max 1.0]
+
+Reports the import times of `allprs.main` (the CLI) and `allprs.runner`, and the
+time until the first search request reaches the fake GitHub API. With --max, exits
+with 1 if the median time to the first search is above it, so startup stays fast.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fake_github import FakeGitHub, Options, Server
+
+
+SEARCH_ENDPOINTS = ("POST /graphql", "GET /search/issues")
+
+
+class Args(argparse.Namespace):
+    runs: int
+    max: float | None
+
+
+def parse_args() -> Args:
+    parser = argparse.ArgumentParser("benchmarks/startup.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max",
+        type=float,
+        help="Fail if the median time to the first search is above this, in seconds",
+    )
+    return parser.parse_args(namespace=Args())
+
+
+def env(home: Path) -> dict[str, str]:
+    env = {
+        "HOME": str(home),
+        "GH_TOKEN": "fake",
+        "PATH": os.environ.get("PATH", ""),
+    }
+    if "PYTHONPATH" in os.environ:
+        env["PYTHONPATH"] = os.environ["PYTHONPATH"]
+    return env
+
+
+def time_python(home: Path, code: str) -> float:
+    start = time.perf_counter()
+    _ = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        [sys.executable, "-c", code], env=env(home), check=True
+    )
+    return time.perf_counter() - start
+
+
+def time_to_first_search(server: Server, home: Path) -> float:
+    # No PRs, so the run ends right after the search
+    server.gh = FakeGitHub(Options(prs=0))
+    start = time.time()
+    _ = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        [sys.executable, "-m", "allprs", "--batch", "--report", os.devnull],
+        env=env(home),
+        check=True,
+    )
+    first_call = server.gh.first_call
+    first_search = min(
+        first_call[name] for name in SEARCH_ENDPOINTS if name in first_call
+    )
+    return first_search - start
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp)
+        server = Server(FakeGitHub(Options(prs=0)))
+        server.start()
+        with (home / ".allprs.json").open("w") as file:
+            json.dump({"api_url": server.url}, file)
+
+        interpreter: list[float] = []
+        cli: list[float] = []
+        runner: list[float] = []
+        first_search: list[float] = []
+        for _ in range(args.runs):
+            interpreter.append(time_python(home, "pass"))
+            cli.append(time_python(home, "import allprs.main"))
+            runner.append(time_python(home, "import allprs.runner"))
+            first_search.append(time_to_first_search(server, home))
+        server.shutdown()
+
+    base = statistics.median(interpreter)
+    print(f"Median of {args.runs} runs, imports without interpreter startup")
+    print(f"  import allprs.main:       {statistics.median(cli) - base:8.3f} s")
+    print(f"  import allprs.runner:     {statistics.median(runner) - base:8.3f} s")
+    median = statistics.median(first_search)
+    print(f"  time to first search:     {median:8.3f} s")
+    if args.max is not None and median > args.max:
+        print(f"Time to first search is above {args.max:.3f} s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Compare the default HTTP transport with the one allprs uses.
+
+Usage: python benchmarks/transport.py [--prs 300] [--latency 0.02] ...
+
+Runs the same requests with both against the fake GitHub API: a REST search for all
+PRs (paginated), and then a few waves of PR requests with idle time in between, like
+status polls. Reports the requests, new connections and wall time of each part.
+The fake API runs in the same process, so the wall time of the waves is mostly its
+CPU time. It only speaks HTTP/1.1 (without TLS), so HTTP/2 isn't measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from typing import Self
+
+from fake_github import FakeGitHub, Options, Server
+from githubkit import GitHub
+
+from allprs.transport import PER_PAGE, transport
+
+
+class Args(argparse.Namespace):
+    prs: int
+    latency: float
+    connect_latency: float
+    concurrency: int
+    waves: int
+    idle: float
+
+
+def parse_args() -> Args:
+    parser = argparse.ArgumentParser("benchmarks/transport.py")
+    parser.add_argument("--prs", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="In seconds")
+    parser.add_argument(
+        "--connect-latency",
+        type=float,
+        default=0.05,
+        help="Seconds added to every new connection, like a TLS handshake",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=20,
+        help="Requests in flight, like the max_concurrency configuration",
+    )
+    parser.add_argument("--waves", type=int, default=3, help="Waves of PR requests")
+    parser.add_argument(
+        "--idle", type=float, default=6.0, help="Seconds between the waves"
+    )
+    return parser.parse_args(namespace=Args())
+
+
+@dataclass
+class Part:
+    requests: int
+    connections: int
+    wall_time: float
+
+
+class Counters:
+    def __init__(self, server: Server) -> None:
+        self.server = server
+        self.start = (0, 0, 0.0)
+
+    def __enter__(self) -> Self:
+        self.start = (
+            sum(self.server.gh.calls.values()),
+            self.server.gh.connections,
+            time.perf_counter(),
+        )
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        requests, connections, start = self.start
+        self.part = Part(
+            sum(self.server.gh.calls.values()) - requests,
+            self.server.gh.connections - connections,
+            time.perf_counter() - start,
+        )
+
+
+async def run_profile(
+    server: Server, args: Args, *, tuned: bool
+) -> tuple[Part, list[Part]]:
+    gh = (
+        GitHub(
+            "fake",
+            base_url=server.url,
+            http_cache=False,
+            async_transport=transport(args.concurrency, http2=True),
+        )
+        if tuned
+        else GitHub("fake", base_url=server.url, http_cache=False)
+    )
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def get_pr(owner: str, repo: str, number: int) -> None:
+        async with slots:
+            _ = await gh.rest.pulls.async_get(owner, repo, number)
+
+    async with gh:
+        with Counters(server) as search:
+            found = [
+                pr
+                async for pr in gh.rest.paginate(
+                    gh.rest.search.async_issues_and_pull_requests,
+                    q="is:pr is:open",
+                    map_func=lambda r: r.parsed_data.items,
+                    # 30 is GitHub's default
+                    per_page=PER_PAGE if tuned else 30,
+                )
+            ]
+        assert len(found) == args.prs
+        waves: list[Part] = []
+        for i in range(args.waves):
+            if i:
+                await asyncio.sleep(args.idle)
+            with Counters(server) as wave:
+                _ = await asyncio.gather(*[
+                    get_pr(pr.owner, pr.repo, pr.number)
+                    for pr in server.gh.prs.values()
+                ])
+            waves.append(wave.part)
+    return search.part, waves
+
+
+def print_part(name: str, part: Part) -> None:
+    print(
+        f"  {name:10} {part.requests:6} requests {part.connections:6} connections "
+        f"{part.wall_time:8.2f} s"
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    server = Server(FakeGitHub(Options(prs=0)))
+    server.start()
+    for tuned in (False, True):
+        server.gh = FakeGitHub(
+            Options(
+                prs=args.prs,
+                latency=args.latency,
+                connect_latency=args.connect_latency,
+            )
+        )
+        search, waves = asyncio.run(run_profile(server, args, tuned=tuned))
+        print("allprs" if tuned else "default")
+        print_part("search", search)
+        for i, wave in enumerate(waves):
+            print_part(f"wave {i + 1}", wave)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+import sys
+
+from allprs.main import main
+
+
+sys.exit(main())
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Literal
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from allprs.pr import Pr
+
+
+type Outcome = Literal["merged", "blocked", "pending"]
+# Of a PR that auto-merge was enabled for
+type State = Literal["enabled", "disabled", "merged", "closed"]
+
+# Fails if the head moved away from the reviewed commit, `expectedHeadOid`
+ENABLE_AUTO_MERGE = """
+mutation EnableAutoMerge($id: ID!, $sha: GitObjectID!) {
+  enablePullRequestAutoMerge(
+    input: { pullRequestId: $id, expectedHeadOid: $sha, mergeMethod: SQUASH }
+  ) {
+    clientMutationId
+  }
+}
+"""
+
+# Once the checks passed, GitHub merges the PR within a few seconds
+MERGE_POLLS = 6
+MERGE_INTERVAL = 5
+
+
+class AutoMergeReconciler:
+    """
+    Follow the PRs that auto-merge was enabled for, and report what became of them.
+
+    Waits for the checks of each PR (in the shared status poller), and then for
+    GitHub to merge it. PRs whose checks failed, that were closed, or that had
+    auto-merge disabled (for example by a new commit) are blocked. PRs that are
+    still waiting at the end of the run are pending, GitHub merges them later.
+    """
+
+    def __init__(
+        self,
+        wait_for_checks: Callable[[Pr], Awaitable[str]],
+        get_state: Callable[[Pr], Awaitable[State]],
+        on_outcome: Callable[[Pr, Outcome, str], Awaitable[None]],
+    ) -> None:
+        self.wait_for_checks = wait_for_checks
+        self.get_state = get_state
+        self.on_outcome = on_outcome
+        self.tasks: dict[asyncio.Task[None], Pr] = {}
+
+    def follow(self, pr: Pr) -> None:
+        task = asyncio.create_task(self.follow_outer(pr))
+        self.tasks[task] = pr
+        task.add_done_callback(self.tasks.pop)
+
+    async def follow_outer(self, pr: Pr) -> None:
+        try:
+            await self.follow_inner(pr)
+        except Exception as err:  # ruff:ignore[blind-except]
+            await self.on_outcome(pr, "blocked", f"failed to follow it: {err}")
+
+    async def follow_inner(self, pr: Pr) -> None:
+        if await self.wait_for_checks(pr) != "success":
+            await self.on_outcome(pr, "blocked", "checks failed")
+            return
+        for _ in range(MERGE_POLLS):
+            match await self.get_state(pr):
+                case "merged":
+                    await self.on_outcome(pr, "merged", "")
+                    return
+                case "closed":
+                    await self.on_outcome(pr, "blocked", "closed")
+                    return
+                case "disabled":
+                    await self.on_outcome(pr, "blocked", "auto-merge was disabled")
+                    return
+                case "enabled":
+                    await asyncio.sleep(MERGE_INTERVAL)
+        # For example because of a required review
+        await self.on_outcome(pr, "blocked", "not merged after the checks passed")
+
+    async def close(self, wait: float) -> None:
+        # Checks can take a long time, so it only waits `wait` seconds for them
+        if self.tasks:
+            _ = await asyncio.wait(self.tasks, timeout=wait)
+        pending = {task: pr for task, pr in self.tasks.items() if not task.done()}
+        for task in pending:
+            _ = task.cancel()
+        _ = await asyncio.gather(*pending, return_exceptions=True)
+        for pr in pending.values():
+            await self.on_outcome(pr, "pending", "waiting for checks")
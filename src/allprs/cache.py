@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, override
+
+from githubkit.cache import BaseCacheStrategy
+from githubkit.cache.mem_cache import MemCache
+from hishel import AsyncSqliteStorage, SyncSqliteStorage
+
+
+if TYPE_CHECKING:
+    import uuid
+
+    from hishel import Entry, Request, Response
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "allprs"
+
+
+class LruSqliteStorage(AsyncSqliteStorage):
+    """
+    Sqlite storage that survives the per-request clients and is evicted by LRU.
+
+    githubkit closes the storage together with the client, which it creates for
+    every request when not used as a context manager. We keep it open until
+    `force_close`, where we also evict the least recently used entries until the
+    cache fits in `max_size` bytes.
+    """
+
+    def __init__(self, database_path: Path, max_size: int) -> None:
+        super().__init__(database_path=database_path)
+        self.max_size = max_size
+        self.used: dict[bytes, float] = {}
+
+    @override
+    async def create_entry(
+        self,
+        request: Request,
+        response: Response,
+        key: str,
+        id_: uuid.UUID | None = None,
+    ) -> Entry:
+        entry = await super().create_entry(request, response, key, id_)
+        self.used[entry.id.bytes] = time.time()
+        return entry
+
+    @override
+    async def get_entries(self, key: str) -> list[Entry]:
+        entries = await super().get_entries(key)
+        for entry in entries:
+            self.used[entry.id.bytes] = time.time()
+        return entries
+
+    @override
+    async def close(self) -> None:
+        pass
+
+    async def force_close(self) -> None:
+        connection = await self._ensure_connection()
+        cursor = await connection.cursor()
+        await cursor.execute(
+            "CREATE TABLE IF NOT EXISTS allprs_last_used ("
+            " entry_id BLOB PRIMARY KEY REFERENCES entries(id) ON DELETE CASCADE,"
+            " used_at REAL NOT NULL"
+            ")"
+        )
+        await cursor.executemany(
+            "INSERT OR REPLACE INTO allprs_last_used (entry_id, used_at) VALUES (?, ?)",
+            self.used.items(),
+        )
+        await cursor.execute(
+            "SELECT e.id, length(e.data) + coalesce(("
+            "  SELECT sum(length(s.chunk_data)) FROM streams s WHERE s.entry_id = e.id"
+            " ), 0)"
+            " FROM entries e LEFT JOIN allprs_last_used u ON u.entry_id = e.id"
+            " ORDER BY coalesce(u.used_at, e.created_at) DESC"
+        )
+        size = 0
+        evict: list[tuple[bytes]] = []
+        entry_id: bytes
+        entry_size: int
+        for entry_id, entry_size in await cursor.fetchall():
+            size += entry_size
+            if size > self.max_size:
+                evict.append((entry_id,))
+        await cursor.executemany("DELETE FROM entries WHERE id = ?", evict)
+        await connection.commit()
+        await super().close()
+
+
+class DiskCacheStrategy(BaseCacheStrategy):
+    """
+    Persist the http cache between runs.
+
+    githubkit asks to always revalidate cached responses, so this only turns
+    repeated requests into conditional ones (If-None-Match/If-Modified-Since).
+    A 304 response doesn't count against the primary rate limit.
+    """
+
+    def __init__(self, path: Path, max_size: int) -> None:
+        self.path = path
+        self.max_size = max_size
+        self._cache = MemCache()  # type: ignore[no-untyped-call]
+        self._async_storage: LruSqliteStorage | None = None
+
+    @override
+    def get_cache_storage(self) -> MemCache:
+        return self._cache
+
+    @override
+    async def get_async_cache_storage(self) -> MemCache:
+        return self._cache
+
+    @override
+    def get_hishel_storage(self) -> SyncSqliteStorage:
+        # Only used for a few requests, so a new connection each time is fine
+        return SyncSqliteStorage(database_path=self.path)
+
+    @override
+    async def get_async_hishel_storage(self) -> LruSqliteStorage:
+        if self._async_storage is None:
+            self._async_storage = LruSqliteStorage(self.path, self.max_size)
+        return self._async_storage
+
+    async def acleanup(self) -> None:
+        if self._async_storage is not None:
+            storage = self._async_storage
+            self._async_storage = None
+            await storage.force_close()
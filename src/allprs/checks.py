@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from allprs.poller import Status
+    from allprs.queries import Rollup
+
+
+# Reductions of the statuses and check runs of a commit to a single state, for both
+#  the REST endpoints and GraphQL's status rollup
+
+
+def check_runs_state(check_runs: Iterable[tuple[str | None, str | None]]) -> Status:
+    # From the conclusion (None while running) and URL of every check run
+    state = "success"
+    fail_example: str | None = None
+    for conclusion, url in check_runs:
+        # Stale check runs never finished, and are common on old PRs. They don't
+        #  block, branch protection still refuses the merge if they're required.
+        if conclusion in {"success", "neutral", "skipped", "stale"}:
+            pass
+        elif conclusion is None and state in {"success", "pending"}:
+            state = "pending"
+        elif conclusion is None and state == "failure":
+            pass
+        elif conclusion in {
+            "failure",
+            "action_required",
+            "cancelled",
+            "timed_out",
+            "startup_failure",
+        }:
+            fail_example = url
+            state = "failure"
+        else:
+            raise AssertionError(conclusion, state)
+    return state, fail_example
+
+
+def combine(status_state: str, check_runs: Status) -> Status:
+    check_run_state, fail_example = check_runs
+    if status_state == "failure" or check_run_state == "failure":
+        state = "failure"
+    elif status_state == "pending" or check_run_state == "pending":
+        state = "pending"
+    elif status_state == "success" and check_run_state == "success":
+        state = "success"
+    else:
+        raise AssertionError(status_state, check_run_state)
+    return state, fail_example
+
+
+def rollup_status(rollup: Rollup | None) -> Status:
+    # The rollup is None for commits without statuses or check runs
+    if rollup is None:
+        return "success", None
+    contexts = rollup["contexts"]["nodes"]
+    # Like the combined status, which is pending without any statuses, but that is
+    #  treated as a success as well
+    states = {context["state"] for context in contexts if "state" in context}
+    if states & {"ERROR", "FAILURE"}:
+        status_state = "failure"
+    elif states & {"EXPECTED", "PENDING"}:
+        status_state = "pending"
+    else:
+        status_state = "success"
+    check_runs = [
+        (
+            None if context["conclusion"] is None else context["conclusion"].lower(),
+            context["url"],
+        )
+        for context in contexts
+        if "conclusion" in context
+    ]
+    return combine(status_state, check_runs_state(check_runs))
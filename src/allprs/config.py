@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import json
+import re
 import sys
 from pathlib import Path
 from typing import Literal, NoReturn
 
+from allprs.policy import Rule
+
 
 def error(s: str) -> NoReturn:
     print(f"ERROR: {s}")
@@ -35,6 +38,56 @@ pr_queries = data.pop(
 )
 pr_queries.extend(data.pop("pr_queries_extend", ()))
 
+# For GitHub Enterprise Server, or a local stand-in like benchmarks/fake_github.py
+api_url: str = data.pop("api_url", "https://api.github.com/")
+
+# Tokens (for example of GitHub Apps) that read requests are spread over, on top of
+#  the user's own. They need read access to the same repositories.
+tokens: list[str] = data.pop("tokens", [])
+
+# Show PRs whose checks are still pending, accepting them enables GitHub's auto-merge
+#  instead of merging them. Requires "Allow auto-merge" in the repository settings.
+auto_merge: bool = data.pop("auto_merge", False)
+# Seconds to wait at the end of the run for auto-merges to land (or be blocked), the
+#  rest are reported as pending
+auto_merge_wait: float = data.pop("auto_merge_wait", 60)
+
+# Maximum number of API requests in flight, the connection pool has room for as many
+max_concurrency: int = data.pop("max_concurrency", 20)
+
+# Multiplex the requests over a single connection with HTTP/2. Only if the `http2`
+#  extra is installed (pip install 'allprs[http2]'), HTTP/1.1 is used otherwise.
+http2: bool = data.pop("http2", True)
+
+# Maximum number of search requests in flight, searches with more than 1,000 results
+#  are split up and their parts run concurrently
+search_concurrency: int = data.pop("search_concurrency", 2)
+
+# How diff groups are ordered for review, the one with the highest score goes first.
+#  The score adds up these weights: per PR in the group, if all of their checks
+#  passed, and per second the group has been waiting for review.
+review_order: dict[str, float] = {"prs": 1, "green": 10, "waiting": 0.05}
+for term, weight in data.pop("review_order", {}).items():
+    if term not in review_order:
+        error(f"found unrecognized review_order term: '{term}'")
+    review_order[term] = weight
+
+# Maximum number of title groups whose diffs are downloaded and grouped at the same
+#  time. Title groups that are waiting for their checks don't count.
+title_group_concurrency: int = data.pop("title_group_concurrency", 20)
+
+# Number of PRs that are merged or closed at the same time (at most one per repo)
+merge_workers: int = data.pop("merge_workers", 4)
+
+# Number of diffs that are rendered with delta at the same time
+render_workers: int = data.pop("render_workers", 4)
+
+# Requests per second spent on polling statuses, shared by all PRs
+status_poll_rate: float = data.pop("status_poll_rate", 10)
+
+# Maximum size of the http cache in ~/.cache/allprs, in MiB
+cache_max_mb: int = data.pop("cache_max_mb", 256)
+
 type Action = Literal["accept", "close", "open", "skip", "quit"]
 keybinds: dict[str, Action] = {
     "a": "accept",
@@ -54,6 +107,42 @@ for kb, val in data.pop("keybinds", {}).items():
     else:
         keybinds[kb] = val
 
+# Rules for --batch. The first rule that matches a diff group decides what happens
+#  to it, diff groups that don't match any rule are skipped.
+policy: list[Rule] = []
+rule_data: dict[str, object]
+for i, rule_data in enumerate(data.pop("policy", [])):
+    if not isinstance(rule_data, dict):
+        error(f"policy rule {i} must be an object")
+    action = rule_data.pop("action", None)
+    if action not in {"accept", "close", "skip"}:
+        error(f"found unrecognized action for policy rule {i}: '{action}'")
+    # Checked here, a mistake would otherwise only show up when a rule is tried
+    for key in ("authors", "files"):
+        value = rule_data.get(key)
+        if value is not None and not (
+            isinstance(value, list) and all(isinstance(item, str) for item in value)
+        ):
+            error(f"'{key}' of policy rule {i} must be a list of strings")
+    max_diff_lines = rule_data.get("max_diff_lines")
+    if max_diff_lines is not None and (
+        not isinstance(max_diff_lines, int) or isinstance(max_diff_lines, bool)
+    ):
+        error(f"'max_diff_lines' of policy rule {i} must be an integer")
+    head_branch_regex = rule_data.get("head_branch_regex")
+    if head_branch_regex is not None:
+        if not isinstance(head_branch_regex, str):
+            error(f"'head_branch_regex' of policy rule {i} must be a string")
+        try:
+            rule_data["head_branch_regex"] = re.compile(head_branch_regex)
+        except re.error as err:
+            error(f"invalid 'head_branch_regex' in policy rule {i}: {err}")
+    try:
+        rule = Rule(action, **rule_data)  # type: ignore[arg-type]
+    except TypeError:
+        error(f"found extra key(s) in policy rule {i}: {", ".join(rule_data)}")
+    policy.append(rule)
+
 
 if data:
     error(f"found extra configuration key(s): {", ".join(data)}")
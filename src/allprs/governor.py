@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, override
+
+from githubkit.exception import RateLimitExceeded
+from githubkit.retry import RETRY_SERVER_ERROR
+from githubkit.throttling import BaseThrottler
+from githubkit.typing import RetryOption
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Generator
+
+    import httpx
+    from githubkit.exception import GitHubException
+
+
+# https://docs.github.com/en/rest/search/search#rate-limit
+SEARCH_PER_MINUTE = 30
+# Keep a few requests of every budget for other tools (and the user)
+RESERVE = 10
+MAX_RETRIES = 5
+# Used for tokens we haven't had a response for yet
+DEFAULT_LIMIT = 5000
+
+
+@dataclass
+class Budget:
+    limit: int | None = None
+    remaining: int | None = None
+    reset: int = 0  # Epoch seconds
+
+
+def resource(request: httpx.Request) -> str:
+    # Matches the X-RateLimit-Resource response header
+    path = request.url.path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+def is_read(request: httpx.Request) -> bool:
+    # Approvals, merges and such must be done by the user, and `GET /user` must
+    #  return the user
+    if request.url.path.endswith("/graphql"):
+        query: str = json.loads(request.content)["query"]
+        return query.lstrip().startswith(("query", "{"))
+    return request.method == "GET" and not request.url.path.endswith("/user")
+
+
+def rendezvous(key: str, token: int, weight: float) -> float:
+    # Weighted rendezvous hashing: the same request keeps going to the same token
+    #  (which keeps the http cache useful), and every token gets a share of the
+    #  requests proportional to its weight
+    digest = hashlib.blake2b(f"{token} {key}".encode(), digest_size=8).digest()
+    x = (int.from_bytes(digest) + 0.5) / 2**64
+    return -weight / math.log(x)
+
+
+class Governor(BaseThrottler):
+    """
+    Pace all requests to stay within GitHub's rate limits.
+
+    Caps the number of requests in flight, spaces out search requests, waits for the
+    reset when a budget is (nearly) used up, and pauses everything when we hit a
+    secondary rate limit, retrying the request afterwards.
+
+    Read requests are spread over the extra tokens as well (if there are any), by
+    their remaining budgets. Token 0 is the one of the client, the user's own.
+    """
+
+    def __init__(self, max_concurrency: int, extra_tokens: list[str]) -> None:
+        self.max_concurrency = max_concurrency
+        self.extra_tokens = extra_tokens
+        self._semaphore = threading.Semaphore(max_concurrency)
+        self._async_semaphore: asyncio.Semaphore | None = None
+        # Keyed by token and resource
+        self.budgets: dict[tuple[int, str], Budget] = {}
+        self.paused_until = 0.0
+        self.next_search: dict[int, float] = {}
+
+    @property
+    def async_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily to bind it to the running event loop
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_semaphore
+
+    def pick_token(self, request: httpx.Request) -> int:
+        if not self.extra_tokens or not is_read(request):
+            return 0
+        name = resource(request)
+        weights = {}
+        for token in range(len(self.extra_tokens) + 1):
+            budget = self.budgets.get((token, name), Budget())
+            if budget.remaining is None:
+                weights[token] = budget.limit or DEFAULT_LIMIT
+            elif budget.remaining > RESERVE:
+                weights[token] = budget.remaining - RESERVE
+        if not weights:
+            # All used up, `delay` waits for the reset of the user's own
+            return 0
+        return max(
+            weights,
+            key=lambda token: rendezvous(str(request.url), token, weights[token]),
+        )
+
+    @staticmethod
+    def token(request: httpx.Request) -> int:
+        token: int = request.extensions.get("allprs_token", 0)
+        return token
+
+    def delay(self, request: httpx.Request) -> float:
+        now = time.time()
+        delay = self.paused_until - now
+        budget = self.budgets.get((self.token(request), resource(request)))
+        if (
+            budget is not None
+            and budget.remaining is not None
+            and budget.remaining <= RESERVE
+        ):
+            delay = max(delay, budget.reset - now)
+        return delay
+
+    @override
+    @contextlib.contextmanager
+    def acquire(self, request: httpx.Request) -> Generator[None]:
+        request.extensions["allprs_token"] = self.pick_token(request)
+        if (delay := self.delay(request)) > 0:
+            time.sleep(delay)
+        with self._semaphore:
+            yield
+
+    @override
+    @contextlib.asynccontextmanager
+    async def async_acquire(self, request: httpx.Request) -> AsyncGenerator[None]:
+        token = request.extensions["allprs_token"] = self.pick_token(request)
+        # Re-check after sleeping, the pause may have been extended in the meantime
+        while (delay := self.delay(request)) > 0:  # ruff:ignore[async-busy-wait]
+            await asyncio.sleep(delay)
+        if resource(request) == "search":
+            # Every token has its own search limit
+            now = time.monotonic()
+            next_search = max(self.next_search.get(token, 0), now)
+            wait = next_search - now
+            self.next_search[token] = next_search + 60 / SEARCH_PER_MINUTE
+            if wait > 0:
+                await asyncio.sleep(wait)
+        async with self.async_semaphore:
+            yield
+
+    async def on_request(self, request: httpx.Request) -> None:
+        # After the client set the user's token
+        if token := self.token(request):
+            request.headers["Authorization"] = f"token {self.extra_tokens[token - 1]}"
+
+    async def on_response(self, response: httpx.Response) -> None:
+        headers = response.headers
+        if "x-ratelimit-remaining" not in headers:
+            return
+        budget = self.budgets.setdefault(
+            (
+                self.token(response.request),
+                headers.get("x-ratelimit-resource", resource(response.request)),
+            ),
+            Budget(),
+        )
+        reset = int(headers["x-ratelimit-reset"])
+        remaining = int(headers["x-ratelimit-remaining"])
+        if reset > budget.reset:
+            # A new window
+            budget.reset = reset
+            budget.remaining = remaining
+        elif reset == budget.reset and budget.remaining is not None:
+            # Responses can arrive out of order (or come from the cache)
+            budget.remaining = min(budget.remaining, remaining)
+        budget.limit = int(headers["x-ratelimit-limit"])
+
+    def retry(self, exc: GitHubException, retry_count: int) -> RetryOption:
+        if retry_count < MAX_RETRIES and isinstance(exc, RateLimitExceeded):
+            # Pause every request, not just this one
+            self.paused_until = max(
+                self.paused_until, time.time() + exc.retry_after.total_seconds()
+            )
+            # The pause itself is done in `async_acquire`
+            return RetryOption(
+                do_retry=True,
+                retry_after=max(exc.retry_after, timedelta(seconds=1)),
+            )
+        return RETRY_SERVER_ERROR(exc, retry_count)
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{name}{f"[{token}]" if token else ""} {budget.remaining}/{budget.limit}"
+            for (token, name), budget in sorted(self.budgets.items())
+        )
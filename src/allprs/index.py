@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from allprs.pr import Pr
+
+
+type HeadKey = tuple[str, str, str | None, str]
+
+
+def head_key(pr: Pr) -> HeadKey:
+    # Base repository, and the head branch (which may be in a fork)
+    return pr.owner, pr.repo, pr.head_owner, pr.head_ref
+
+
+class OpenPrIndex:
+    """
+    The open PRs we know of, by repository and head branch.
+
+    Built from the PRs we already fetched during discovery, and updated as we merge
+    and close them, so checking whether a head branch is still used by another PR
+    doesn't need a request.
+    """
+
+    def __init__(self) -> None:
+        self.numbers: defaultdict[HeadKey, set[int]] = defaultdict(set)
+
+    def add(self, prs: Iterable[Pr]) -> None:
+        for pr in prs:
+            self.numbers[head_key(pr)].add(pr.number)
+
+    def remove(self, pr: Pr) -> None:
+        self.numbers[head_key(pr)].discard(pr.number)
+
+    def head_in_use(self, pr: Pr) -> bool:
+        return bool(self.numbers[head_key(pr)] - {pr.number})
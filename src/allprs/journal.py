@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, cast
+
+
+if TYPE_CHECKING:
+    from allprs.pr import Pr
+
+
+type Decision = Literal["accept", "close", "skip"]
+type FollowUp = Literal["merge", "auto-merge", "close"]
+
+
+def state_dir() -> Path:
+    return (
+        Path(os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state")
+        / "allprs"
+    )
+
+
+class Journal:
+    """
+    What we decided in earlier runs, and what we didn't get to finish.
+
+    Decisions are keyed by title and diff fingerprint, so a diff group that was
+    reviewed before isn't shown again, also when the same diff shows up in new
+    repositories. Every merge and close is written down before it starts and removed
+    once it's done, so a run that crashed or was interrupted can be resumed. Along
+    with the head commit that was reviewed, so a merge isn't resumed after new
+    commits were pushed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit, every change is written immediately
+        self.connection = sqlite3.connect(path, autocommit=True)
+        _ = self.connection.execute("PRAGMA journal_mode=WAL")
+        _ = self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            " title TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " action TEXT NOT NULL,"
+            " decided_at REAL NOT NULL,"
+            " PRIMARY KEY (title, fingerprint)"
+            ")"
+        )
+        _ = self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " owner TEXT NOT NULL,"
+            " repo TEXT NOT NULL,"
+            " number INTEGER NOT NULL,"
+            " action TEXT NOT NULL,"
+            " queued_at REAL NOT NULL,"
+            " sha TEXT NOT NULL,"  # Of the head commit that was reviewed
+            " PRIMARY KEY (owner, repo, number)"
+            ")"
+        )
+
+    def decision(self, title: str, fingerprint: str) -> Decision | None:
+        row = self.connection.execute(
+            "SELECT action FROM decisions WHERE title = ? AND fingerprint = ?",
+            (title, fingerprint),
+        ).fetchone()
+        return None if row is None else cast("Decision", row[0])
+
+    def decide(self, title: str, fingerprint: str, action: Decision) -> None:
+        _ = self.connection.execute(
+            "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?)",
+            (title, fingerprint, action, time.time()),
+        )
+
+    def forget(self) -> None:
+        _ = self.connection.execute("DELETE FROM decisions")
+
+    def pending(self) -> list[tuple[str, str, int, FollowUp, str]]:
+        return cast(
+            "list[tuple[str, str, int, FollowUp, str]]",
+            self.connection.execute(
+                "SELECT owner, repo, number, action, sha FROM pending"
+                " ORDER BY queued_at"
+            ).fetchall(),
+        )
+
+    def add_pending(self, pr: Pr, action: FollowUp, sha: str) -> None:
+        _ = self.connection.execute(
+            "INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?, ?, ?)",
+            (pr.owner, pr.repo, pr.number, action, time.time(), sha),
+        )
+
+    def remove_pending(self, owner: str, repo: str, number: int) -> None:
+        _ = self.connection.execute(
+            "DELETE FROM pending WHERE owner = ? AND repo = ? AND number = ?",
+            (owner, repo, number),
+        )
+
+    def close(self) -> None:
+        self.connection.close()
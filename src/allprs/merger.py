@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from githubkit.exception import RequestFailed
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from allprs.pr import Pr
+
+
+# Merge errors that go away by themselves, see `retry_transient`
+TRANSIENT_MESSAGES = (
+    "Base branch was modified",
+    "Merge already in progress",
+)
+MAX_ATTEMPTS = 5
+
+
+def is_transient(err: RequestFailed) -> bool:
+    # 405 is also used for PRs that can't be merged at all (conflicts,
+    #  required reviews), so check the message. A head that moved away from the
+    #  reviewed sha doesn't come back.
+    if "Head branch was modified" in err.response.text:
+        return False
+    status = err.response.status_code
+    return status == 409 or (  # ruff:ignore[magic-value-comparison]
+        status == 405  # ruff:ignore[magic-value-comparison]
+        and any(message in err.response.text for message in TRANSIENT_MESSAGES)
+    )
+
+
+async def retry_transient[T](f: Callable[[], Awaitable[T]]) -> T:
+    for attempt in itertools.count(1):
+        try:
+            return await f()
+        except RequestFailed as err:
+            if attempt >= MAX_ATTEMPTS or not is_transient(err):
+                raise
+        # Jittered, so PRs that failed together don't retry together
+        await asyncio.sleep(random.uniform(1, 2) * 2 ** (attempt - 1))  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+    raise AssertionError  # Unreachable
+
+
+@dataclass
+class Progress:
+    queued: int = 0
+    in_flight: int = 0
+    done: int = 0
+    failed: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.queued} queued, {self.in_flight} in flight, "
+            f"{self.done} done, {self.failed} failed"
+        )
+
+
+class MergeExecutor:
+    """
+    Run follow-up actions (merging, closing) on a fixed number of workers.
+
+    Actions on PRs in the same repository run one at a time, since concurrent merges
+    into the same base branch fail with "Base branch was modified". Workers only pick
+    up repositories that nothing is running in, so a repository with many actions
+    doesn't hold up the others.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        # The actions of each repository that has any, queued or running
+        self.pending: dict[
+            tuple[str, str], deque[tuple[Pr, Callable[[Pr], Awaitable[bool]]]]
+        ] = {}
+        # Repositories in `pending` that no worker is running an action in
+        self.ready: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        self.progress = Progress()
+        self.stopped = False
+
+    def submit(self, pr: Pr, action: Callable[[Pr], Awaitable[bool]]) -> None:
+        if self.stopped:
+            # It would never run
+            msg = f"Submitted an action for {pr.html_url} after the executor stopped"
+            raise RuntimeError(msg)
+        self.progress.queued += 1
+        repo = (pr.owner, pr.repo)
+        if repo not in self.pending:
+            self.pending[repo] = deque()
+            self.ready.put_nowait(repo)
+        self.pending[repo].append((pr, action))
+
+    async def run(self) -> None:
+        # Runs until cancelled, use `join` to wait for the submitted actions
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for _ in range(self.workers):
+                    _ = tg.create_task(self.worker())
+        finally:
+            self.stopped = True
+
+    async def worker(self) -> None:
+        while True:
+            repo = await self.ready.get()
+            pr, action = self.pending[repo].popleft()
+            try:
+                self.progress.queued -= 1
+                self.progress.in_flight += 1
+                try:
+                    ok = await action(pr)
+                finally:
+                    self.progress.in_flight -= 1
+            finally:
+                # To the back of the queue, so other repositories get a turn
+                if self.pending[repo]:
+                    self.ready.put_nowait(repo)
+                else:
+                    del self.pending[repo]
+                self.ready.task_done()
+            if ok:
+                self.progress.done += 1
+            else:
+                self.progress.failed += 1
+
+    async def join(self, on_progress: Callable[[Progress], None]) -> None:
+        join_task = asyncio.create_task(self.ready.join())
+        while not join_task.done():
+            on_progress(self.progress)
+            _ = await asyncio.wait([join_task], timeout=0.5)
+        on_progress(self.progress)
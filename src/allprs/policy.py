@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Literal
+
+
+if TYPE_CHECKING:
+    import re
+    from collections.abc import Sequence
+
+    from allprs.pr import Pr
+
+
+type PolicyAction = Literal["accept", "close", "skip"]
+
+
+def unquote(path: str) -> str:
+    # Git quotes paths with special characters, escaping non-ASCII bytes in octal
+    if not path.startswith('"'):
+        return path
+    return path[1:-1].encode().decode("unicode_escape").encode("latin-1").decode()
+
+
+def changed_files(diff: str) -> set[str]:
+    # From the headers, since binary files and mode changes don't have ---/+++ lines
+    files = set()
+    for line in diff.splitlines():
+        if line.startswith("diff --git "):
+            # "a/{path} b/{path}", split in the middle since the path can contain
+            #  " b/". Renames have different paths, but also their own lines.
+            paths = line.removeprefix("diff --git ")
+            old, new = paths[: len(paths) // 2], paths[len(paths) // 2 + 1 :]
+            old, new = unquote(old), unquote(new)
+            if old.startswith("a/") and new.startswith("b/") and old[2:] == new[2:]:
+                files.add(old[2:])
+        # Both sides, so renames need to match as well
+        elif line.startswith(("rename from ", "rename to ", "copy from ", "copy to ")):
+            files.add(unquote(line.split(" ", 2)[2]))
+    return files
+
+
+def changed_lines(diff: str) -> int:
+    return sum(
+        1
+        for line in diff.splitlines()
+        if line.startswith(("+", "-")) and not line.startswith(("+++ ", "--- "))
+    )
+
+
+@dataclass
+class Rule:
+    """
+    A rule for `--batch`, which matches a diff group if all of its conditions do.
+
+    Conditions that aren't specified always match.
+    """
+
+    action: PolicyAction
+    # The author of every PR must be one of these
+    authors: list[str] | None = None
+    # The head branch of every PR must match this
+    head_branch_regex: re.Pattern[str] | None = None
+    # Every changed file must match one of these globs
+    files: list[str] | None = None
+    # Maximum number of added and removed lines
+    max_diff_lines: int | None = None
+
+    def matches(self, diff: str, prs: Sequence[Pr]) -> bool:
+        if self.authors is not None and any(
+            pr.author not in self.authors for pr in prs
+        ):
+            return False
+        if self.head_branch_regex is not None and any(
+            not self.head_branch_regex.match(pr.head_ref) for pr in prs
+        ):
+            return False
+        if self.files is not None and any(
+            not any(fnmatch(file, pattern) for pattern in self.files)
+            for file in changed_files(diff)
+        ):
+            return False
+        return self.max_diff_lines is None or changed_lines(diff) <= self.max_diff_lines
+
+
+def decide(
+    rules: Sequence[Rule], diff: str, prs: Sequence[Pr]
+) -> tuple[PolicyAction, int | None]:
+    # The first matching rule wins, returns its index as well
+    for i, rule in enumerate(rules):
+        if rule.matches(diff, prs):
+            return rule.action, i
+    return "skip", None
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Literal
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Sequence
+
+    from allprs.pr import Pr
+
+
+type Status = tuple[str, str | None]
+# The status, and the head commit it belongs to
+type Result = tuple[Status, str]
+
+# Of the jobs that are due, the ones that are likely to be conclusive go before the
+#  ones that were pending last time
+CONCLUSIVE = 0
+PENDING = 1
+
+# Backoff for PRs with pending checks, doubling every poll
+MIN_INTERVAL = 5
+MAX_INTERVAL = 60
+
+# Head shas fetched within this many seconds are reused, so PRs that are
+#  checked in the same tick share one request
+HEAD_TTL = 1
+
+# The statuses of up to this many head commits are polled in one request, including
+#  the ones that are due within the window (polling them a bit early doesn't hurt)
+BATCH_SIZE = 100
+BATCH_WINDOW = 1
+
+
+@dataclass(order=True)
+class Job:
+    due: float
+    priority: int
+    seq: int
+    pr: Pr = field(compare=False)
+    future: asyncio.Future[Result] = field(compare=False)
+    sha: str = field(compare=False)
+    phase: Literal["poll", "recheck"] = field(default="poll", compare=False)
+    pending_polls: int = field(default=0, compare=False)
+    # Finish when the checks are pending, instead of waiting for them
+    pending_ok: bool = field(default=False, compare=False)
+    failure: Status | None = field(default=None, compare=False)
+
+
+class StatusPoller:
+    """
+    Wait for the checks of many PRs at once, with a global request budget.
+
+    Every PR is a job in a single schedule instead of having its own polling loop.
+    PRs with pending checks are polled less often the longer they are pending. The
+    PRs that are due are polled together, in a single request per batch, and when
+    the budget is short the ones that are likely to be conclusive go first.
+    """
+
+    def __init__(
+        self,
+        get_head_sha: Callable[[Pr], Awaitable[str]],
+        get_statuses: Callable[
+            [Sequence[tuple[Pr, str]]], Awaitable[list[Status | BaseException]]
+        ],
+        *,
+        rate: float,
+    ) -> None:
+        self.get_head_sha = get_head_sha
+        self.get_statuses = get_statuses
+        self.rate = rate
+        self.batch_size = BATCH_SIZE
+        self.head_shas: dict[
+            tuple[str, str, int], tuple[float, asyncio.Future[str]]
+        ] = {}
+        # Scheduled jobs by when they're due, and the jobs that are due by priority
+        self.heap: list[Job] = []
+        self.ready: list[tuple[int, float, int, Job]] = []
+        self.seq = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task[None] | None = None
+        self.steps: set[asyncio.Task[None]] = set()
+        self.next_slot = 0.0
+
+    async def wait(self, pr: Pr, *, pending_ok: bool = False) -> Result:
+        future: asyncio.Future[Result] = asyncio.get_running_loop().create_future()
+        # The head sha we got from the search (or PR request) is recent enough
+        job = Job(0, CONCLUSIVE, next(self.seq), pr, future, pr.head_sha)
+        job.pending_ok = pending_ok
+        self.schedule(job, 0, CONCLUSIVE)
+        return await future
+
+    def schedule(self, job: Job, delay: float, priority: int) -> None:
+        job.due = time.monotonic() + delay
+        job.priority = priority
+        job.seq = next(self.seq)
+        heapq.heappush(self.heap, job)
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def promote(self) -> None:
+        # Move the jobs that are due to `ready`
+        now = time.monotonic()
+        while self.heap and self.heap[0].due <= now:
+            job = heapq.heappop(self.heap)
+            heapq.heappush(self.ready, (job.priority, job.due, job.seq, job))
+
+    async def run(self) -> None:
+        while self.heap or self.ready:
+            self.promote()
+            if not self.ready:
+                delay = self.heap[0].due - time.monotonic()
+                self.wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    async with asyncio.timeout(delay):
+                        await self.wakeup.wait()
+                continue
+            *_, job = heapq.heappop(self.ready)
+            if job.future.done():
+                # Cancelled, for example because we quit
+                continue
+            await self.throttle()
+            # Jobs that became due while throttling go in the batch as well
+            self.promote()
+            jobs = [job, *self.pop_batch()] if job.phase == "poll" else [job]
+            step = asyncio.create_task(self.step(jobs))
+            self.steps.add(step)
+            step.add_done_callback(self.steps.discard)
+
+    def pop_batch(self) -> list[Job]:
+        # The other poll jobs that are due (by priority) or almost due, rechecks
+        #  stay in the schedule
+        batch: list[Job] = []
+        rechecks: list[Job] = []
+        until = time.monotonic() + BATCH_WINDOW
+        while len(batch) < self.batch_size - 1:
+            if self.ready:
+                *_, job = heapq.heappop(self.ready)
+            elif self.heap and self.heap[0].due <= until:
+                job = heapq.heappop(self.heap)
+            else:
+                break
+            if job.future.done():
+                continue
+            (batch if job.phase == "poll" else rechecks).append(job)
+        for job in rechecks:
+            heapq.heappush(self.heap, job)
+        return batch
+
+    async def throttle(self) -> None:
+        now = time.monotonic()
+        self.next_slot = max(self.next_slot, now)
+        wait = self.next_slot - now
+        self.next_slot += 1 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def head_sha(self, pr: Pr) -> str:
+        key = (pr.owner, pr.repo, pr.number)
+        now = time.monotonic()
+        cached = self.head_shas.get(key)
+        if cached is None or now - cached[0] > HEAD_TTL:
+            cached = (now, asyncio.ensure_future(self.get_head_sha(pr)))
+            self.head_shas[key] = cached
+        return await cached[1]
+
+    async def step(self, jobs: list[Job]) -> None:
+        # A batch of polls, or a single recheck
+        try:
+            if jobs[0].phase == "poll":
+                await self.poll(jobs)
+            else:
+                await self.recheck(jobs[0])
+        except Exception as err:  # ruff:ignore[blind-except]
+            # Raise it in the waiting tasks instead
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(err)
+
+    async def poll(self, jobs: list[Job]) -> None:
+        statuses = await self.get_statuses([(job.pr, job.sha) for job in jobs])
+        for job, status in zip(jobs, statuses, strict=True):
+            if job.future.done():
+                # The waiting task was cancelled in the meantime, like in `finish`
+                continue
+            if isinstance(status, BaseException):
+                # An error of this PR alone, the others in the batch carry on
+                job.future.set_exception(status)
+            else:
+                self.polled(job, status)
+
+    def polled(self, job: Job, status: Status) -> None:
+        state, _fail_example = status
+        if state == "pending" and job.pending_ok:
+            self.finish(job, status)
+        elif state == "pending":
+            interval = min(MIN_INTERVAL * 2**job.pending_polls, MAX_INTERVAL)
+            job.pending_polls += 1
+            self.schedule(job, interval, PENDING)
+        elif state == "failure":
+            # Because new commits can get pushed by pre-commit.ci and similar:
+            # check whether there's a new commit made since the failure
+            job.failure = status
+            job.phase = "recheck"
+            self.schedule(job, 2, CONCLUSIVE)
+        else:
+            # We assume any other states will never result in a new commit
+            self.finish(job, status)
+
+    async def recheck(self, job: Job) -> None:
+        assert job.failure is not None  # ruff:ignore[assert]
+        new_sha = await self.head_sha(job.pr)
+        if job.sha != new_sha:
+            # ...continue with the new commit
+            job.sha = new_sha
+            job.phase = "poll"
+            job.pending_polls = 0
+            # Wait until new checks are started to avoid
+            #  seeing "success" before any checks were added
+            self.schedule(job, MIN_INTERVAL, CONCLUSIVE)
+        else:
+            self.finish(job, job.failure)
+
+    @staticmethod
+    def finish(job: Job, status: Status) -> None:
+        # The waiting task may have been cancelled in the meantime
+        if not job.future.done():
+            job.future.set_result((status, job.sha))
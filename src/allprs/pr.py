@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from githubkit_schemas.latest.models import PullRequest
+
+    from allprs.queries import PrNode
+
+
+@dataclass(frozen=True, slots=True)
+class Pr:
+    """
+    The parts of a pull request that we actually use.
+
+    Made once when the PR is found, and shared by everything after. There can be
+    thousands, so it doesn't keep the (much bigger) githubkit model around.
+    """
+
+    owner: str
+    repo: str
+    number: int
+    # For GraphQL mutations
+    node_id: str
+    title: str
+    author: str
+    head_ref: str
+    head_sha: str
+    # None if the head repository was deleted
+    head_owner: str | None
+    head_repo: str | None
+    html_url: str
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.repo}"
+
+    @property
+    def url(self) -> str:
+        # Relative to the API base url
+        return f"/repos/{self.owner}/{self.repo}/pulls/{self.number}"
+
+    @classmethod
+    def from_rest(cls, pr: PullRequest) -> Pr:
+        assert pr.base.repo.owner is not None  # ruff:ignore[assert]
+        head_repo = pr.head.repo
+        head_owner = head_repo.owner if head_repo is not None else None
+        return cls(
+            owner=pr.base.repo.owner.login,
+            repo=pr.base.repo.name,
+            number=pr.number,
+            node_id=pr.node_id,
+            title=pr.title,
+            author=pr.user.login,
+            head_ref=pr.head.ref,
+            head_sha=pr.head.sha,
+            head_owner=head_owner.login if head_owner is not None else None,
+            head_repo=head_repo.name if head_repo is not None else None,
+            html_url=pr.html_url,
+        )
+
+    @classmethod
+    def from_graphql(cls, node: PrNode) -> Pr:
+        head_repo = node["headRepository"]
+        return cls(
+            owner=node["repository"]["owner"]["login"],
+            repo=node["repository"]["name"],
+            number=node["number"],
+            node_id=node["id"],
+            title=node["title"],
+            # The author is None for deleted accounts ("ghost")
+            author=node["author"]["login"] if node["author"] is not None else "ghost",
+            head_ref=node["headRefName"],
+            head_sha=node["headRefOid"],
+            head_owner=head_repo["owner"]["login"] if head_repo is not None else None,
+            head_repo=head_repo["name"] if head_repo is not None else None,
+            html_url=node["url"],
+        )
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import TypedDict
+
+
+# GraphQL queries and the shapes of their results.
+# Every query is named, so its traffic is recognizable in logs.
+
+
+class Owner(TypedDict):
+    login: str
+
+
+class Repository(TypedDict):
+    name: str
+    owner: Owner
+
+
+class Author(TypedDict):
+    login: str
+
+
+class PrNode(TypedDict):
+    id: str
+    number: int
+    title: str
+    url: str
+    author: Author | None
+    repository: Repository
+    headRefName: str
+    headRefOid: str
+    headRepository: Repository | None
+
+
+class PageInfo(TypedDict):
+    hasNextPage: bool
+    endCursor: str | None
+
+
+class Search(TypedDict):
+    issueCount: int
+    pageInfo: PageInfo
+    # Empty objects for search results that aren't pull requests
+    nodes: list[PrNode]
+
+
+class SearchResult(TypedDict):
+    search: Search
+
+
+PR_FIELDS = """
+fragment PrFields on PullRequest {
+  id
+  number
+  title
+  url
+  author { login }
+  repository { name owner { login } }
+  headRefName
+  headRefOid
+  headRepository { name owner { login } }
+}
+"""
+
+SEARCH_PRS = (
+    """
+query SearchPrs($query: String!, $cursor: String) {
+  search(query: $query, type: ISSUE, first: 100, after: $cursor) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes { ...PrFields }
+  }
+}
+"""
+    + PR_FIELDS
+)
+
+
+class RollupContext(TypedDict, total=False):
+    # A check run has a conclusion (None while it runs) and a URL, a status has a
+    #  state
+    conclusion: str | None
+    url: str
+    state: str
+
+
+class RollupContexts(TypedDict):
+    pageInfo: PageInfo
+    nodes: list[RollupContext]
+
+
+class Rollup(TypedDict):
+    contexts: RollupContexts
+
+
+class RollupCommit(TypedDict):
+    statusCheckRollup: Rollup | None
+
+
+class RollupRepository(TypedDict):
+    # None if the commit doesn't exist (anymore)
+    object: RollupCommit | None
+
+
+ROLLUP_FIELDS = """
+fragment RollupFields on Commit {
+  statusCheckRollup {
+    contexts(first: 100) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        ... on CheckRun { conclusion url }
+        ... on StatusContext { state }
+      }
+    }
+  }
+}
+"""
+
+
+def status_rollup(count: int) -> str:
+    # A query for the rollups of `count` commits, in fields `head0`, `head1`, ...
+    #  with variables `owner0`, `repo0`, `sha0`, ...
+    variables = ", ".join(
+        f"$owner{i}: String!, $repo{i}: String!, $sha{i}: GitObjectID!"
+        for i in range(count)
+    )
+    fields = "".join(
+        f"  head{i}: repository(owner: $owner{i}, name: $repo{i}) {{\n"
+        f"    object(oid: $sha{i}) {{ ...RollupFields }}\n"
+        "  }\n"
+        for i in range(count)
+    )
+    return f"query StatusRollup({variables}) {{\n{fields}}}\n" + ROLLUP_FIELDS
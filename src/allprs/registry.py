@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+    from allprs.pr import Pr
+
+
+type PrKey = tuple[str, str, int]
+
+
+def pr_key(pr: Pr) -> PrKey:
+    return pr.owner, pr.repo, pr.number
+
+
+class PrRegistry:
+    """
+    Every PR found in this run, by (owner, repo, number).
+
+    The PR queries overlap, the default ones and often the `pr_queries_extend` ones as
+    well. Each PR is fetched once, however many queries find it, and only the first
+    query that claims it processes it: polls its status, downloads its diff and puts
+    it in the queue.
+    """
+
+    def __init__(self) -> None:
+        self.fetches: dict[PrKey, asyncio.Future[Pr]] = {}
+        self.claimed: set[PrKey] = set()
+
+    async def fetch(self, key: PrKey, f: Callable[[], Awaitable[Pr]]) -> Pr:
+        # Concurrent fetches of the same PR share one
+        if key not in self.fetches:
+            self.fetches[key] = asyncio.ensure_future(f())
+        return await self.fetches[key]
+
+    def claim(self, prs: Iterable[Pr]) -> list[Pr]:
+        # Returns the PRs that no other query claimed. Doesn't await, so two queries
+        #  can't both claim a PR
+        claimed = []
+        for pr in prs:
+            key = pr_key(pr)
+            if key not in self.claimed:
+                self.claimed.add(key)
+                claimed.append(pr)
+        return claimed
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shlex
+import sys
+from shutil import get_terminal_size, which
+
+
+# Keeps the colors, and quits by itself when the diff fits on the screen after all
+PAGER = "less -FR"
+
+
+class Renderer:
+    """
+    Render diffs with delta ahead of time, a few at a time.
+
+    Diff groups are rendered as soon as they're queued, so showing one doesn't have
+    to wait for delta. delta runs as a subprocess, which doesn't block the event
+    loop (and status polling, merging, ...) like `subprocess.run` does.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.slots = asyncio.Semaphore(workers)
+        self.delta = which("delta")
+        # Keyed by diff fingerprint
+        self.rendered: dict[str, asyncio.Task[bytes]] = {}
+
+    def prefetch(self, fingerprint: str, diff: str) -> None:
+        if fingerprint not in self.rendered:
+            self.rendered[fingerprint] = asyncio.create_task(self.render(diff))
+
+    async def take(self, fingerprint: str, diff: str) -> bytes:
+        # It's only shown once, so it's not kept
+        self.prefetch(fingerprint, diff)
+        return await self.rendered.pop(fingerprint)
+
+    async def render(self, diff: str) -> bytes:
+        if self.delta is None:
+            return b"\n" + diff.encode() + b"\n"
+        async with self.slots:
+            process = await asyncio.create_subprocess_exec(
+                self.delta,
+                "--paging=never",
+                # delta can't see the terminal, its output goes to us
+                f"--width={get_terminal_size().columns}",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            output, _ = await process.communicate(diff.encode())
+        return output
+
+
+def write(rendered: bytes) -> None:
+    sys.stdout.flush()
+    _ = sys.stdout.buffer.write(rendered)
+    sys.stdout.buffer.flush()
+
+
+async def show(rendered: bytes) -> None:
+    # Diffs that don't fit on the screen are shown in a pager, like delta does
+    if rendered.count(b"\n") < get_terminal_size().lines:
+        write(rendered)
+        return
+    pager = shlex.split(
+        os.environ.get("DELTA_PAGER") or os.environ.get("PAGER") or PAGER
+    )
+    try:
+        # The pager reads keys from the terminal, not from stdin
+        process = await asyncio.create_subprocess_exec(
+            *pager, stdin=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        write(rendered)
+        return
+    _ = await process.communicate(rendered)
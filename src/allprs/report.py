@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+    from allprs.automerge import Outcome
+    from allprs.merger import Progress
+    from allprs.policy import PolicyAction
+
+
+@dataclass
+class Decision:
+    title: str
+    prs: list[str]  # URLs
+    action: PolicyAction
+    reason: str
+    elapsed: float  # Seconds since the start of the run
+
+
+@dataclass
+class AutoMerge:
+    pr: str  # URL
+    outcome: Outcome
+    reason: str
+    elapsed: float
+
+
+@dataclass
+class Report:
+    """What `--batch` did, written as JSON at the end of the run."""
+
+    started: float = field(default_factory=time.time)
+    decisions: list[Decision] = field(default_factory=list)
+    auto_merges: list[AutoMerge] = field(default_factory=list)
+
+    def elapsed(self) -> float:
+        return round(time.time() - self.started, 3)
+
+    def decide(
+        self, title: str, prs: list[str], action: PolicyAction, reason: str
+    ) -> None:
+        self.decisions.append(Decision(title, prs, action, reason, self.elapsed()))
+
+    def auto_merge(self, pr: str, outcome: Outcome, reason: str) -> None:
+        self.auto_merges.append(AutoMerge(pr, outcome, reason, self.elapsed()))
+
+    def dump(self, file: TextIO, warnings: list[str], progress: Progress) -> None:
+        json.dump(
+            {
+                "started": self.started,
+                "elapsed": self.elapsed(),
+                "decisions": [dataclasses.asdict(d) for d in self.decisions],
+                "follow_up": dataclasses.asdict(progress),
+                "auto_merge": [dataclasses.asdict(a) for a in self.auto_merges],
+                "warnings": warnings,
+            },
+            file,
+            indent=2,
+        )
+        file.write("\n")
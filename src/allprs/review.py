@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+    from allprs.runner import FullPr
+
+
+# Title, diff, and the PRs that have it
+type DiffGroup = tuple[str, str, Sequence[FullPr]]
+
+
+@dataclass(order=True)
+class Entry:
+    key: float
+    seq: int
+    group: DiffGroup = field(compare=False)
+    title_group: int = field(compare=False)
+
+
+class ReviewQueue:
+    """
+    The diff groups that are ready for review, the best one first.
+
+    A diff group is scored by the weights in `config.review_order`: per PR in it, if
+    all of its checks passed, and per second it has been waiting. So a big green
+    group that is ready late still goes before the small groups that were ready
+    earlier, and the most PRs are merged per keystroke.
+    """
+
+    def __init__(self, weights: Mapping[str, float]) -> None:
+        self.weights = weights
+        self.heap: list[Entry] = []
+        self.seq = itertools.count()
+        self.title_groups = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.unfinished = 0
+        self.finished = asyncio.Event()
+        self.finished.set()
+
+    def score(self, diff_prs: Sequence[FullPr]) -> float:
+        green = all(pr.status[0] == "success" for pr in diff_prs)
+        return self.weights["prs"] * len(diff_prs) + self.weights["green"] * green
+
+    def put(self, title_group: Sequence[DiffGroup]) -> None:
+        # The diff groups of a title group are put at once, see `take_title_group`
+        title_group_id = next(self.title_groups)
+        now = time.monotonic()
+        for group in title_group:
+            _title, _diff, diff_prs = group
+            # Waiting groups all gain score at the same rate, so instead groups lose
+            #  score for being ready later, and the order doesn't change while waiting
+            score = self.score(diff_prs) - self.weights["waiting"] * now
+            heapq.heappush(
+                self.heap, Entry(-score, next(self.seq), group, title_group_id)
+            )
+        self.unfinished += len(title_group)
+        if self.unfinished:
+            self.finished.clear()
+        self.wakeup.set()
+
+    async def get(self) -> Entry | None:
+        # None once it's closed and empty
+        while not self.heap:
+            if self.closed:
+                return None
+            self.wakeup.clear()
+            await self.wakeup.wait()
+        return heapq.heappop(self.heap)
+
+    def take_title_group(self, entry: Entry) -> list[DiffGroup]:
+        # Removes the other diff groups in the title group of `entry`, for example
+        #  because the user closed all of them
+        taken = [other for other in self.heap if other.title_group == entry.title_group]
+        self.heap = [
+            other for other in self.heap if other.title_group != entry.title_group
+        ]
+        heapq.heapify(self.heap)
+        for _ in taken:
+            self.task_done()
+        return [other.group for other in taken]
+
+    def task_done(self) -> None:
+        self.unfinished -= 1
+        if not self.unfinished:
+            self.finished.set()
+
+    async def join(self) -> None:
+        await self.finished.wait()
+
+    def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
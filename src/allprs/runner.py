@@ -0,0 +1,1006 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import hashlib
+import itertools
+import re
+import sys
+import time
+import webbrowser
+from asyncio import Event, Future, Task
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal, cast
+
+from githubkit import GitHub
+from githubkit.exception import GraphQLFailed, RequestFailed
+
+from allprs import config
+from allprs.automerge import ENABLE_AUTO_MERGE, AutoMergeReconciler
+from allprs.cache import DiskCacheStrategy, cache_dir
+from allprs.checks import check_runs_state, combine, rollup_status
+from allprs.config import pr_queries
+from allprs.governor import Governor
+from allprs.index import OpenPrIndex
+from allprs.journal import Journal, state_dir
+from allprs.merger import MergeExecutor, retry_transient
+from allprs.policy import decide
+from allprs.poller import StatusPoller
+from allprs.pr import Pr
+from allprs.queries import SEARCH_PRS, status_rollup
+from allprs.registry import PrRegistry
+from allprs.render import Renderer, show
+from allprs.report import Report
+from allprs.review import ReviewQueue
+from allprs.search import SearchPlanner
+from allprs.store import FULL_SYNC_INTERVAL, SYNC_MARGIN, PrStore
+from allprs.tracing import Tracer
+from allprs.transport import PER_PAGE, transport
+from allprs.utils import (
+    areadchar,
+    clear,
+    group_by,
+    print_line,
+    prompt,
+)
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable, Sequence
+    from concurrent.futures import Future as ConcurrentFuture
+
+    from githubkit import TokenAuthStrategy
+    from githubkit_schemas.latest.models import IssueSearchResultItem
+
+    from allprs.automerge import Outcome, State
+    from allprs.journal import Decision, FollowUp
+    from allprs.main import Args
+    from allprs.merger import Progress
+    from allprs.poller import Status
+    from allprs.queries import RollupRepository, Search, SearchResult
+
+
+@dataclass(frozen=True, slots=True)
+class FullPr:
+    pr: Pr
+    sha: str  # Of the head commit that was reviewed, merges fail if it moved
+    fingerprint: str  # Of the diff
+    status: Status
+
+
+class Runner:  # ruff:ignore[too-many-public-methods]
+    def __init__(self, args: Args, token: ConcurrentFuture[str]) -> None:
+        self.args = args
+        self.token = token
+        self.urls = None
+        self.title = None
+        if args.urls_or_titles:
+            if all(s.startswith("https://github.com/") for s in args.urls_or_titles):
+                self.urls = args.urls_or_titles
+            else:
+                if len(args.urls_or_titles) > 1:
+                    # TODO(GideonBear): arbitrary restriction  # ruff:ignore[line-contains-todo, missing-todo-link]
+                    print("Error: expected only one title to be specified")
+                    sys.exit(2)
+                # Must be one since it's not empty
+                self.title = args.urls_or_titles[0]
+
+        self.cache = DiskCacheStrategy(
+            cache_dir() / "http.sqlite", config.cache_max_mb * 1024 * 1024
+        )
+        self.governor = Governor(config.max_concurrency, config.tokens)
+        self.tracer = Tracer(enabled=args.profile is not None)
+        # Created in `run`, once the token is known
+        self.gh: GitHub[TokenAuthStrategy]
+        self.queue = ReviewQueue(config.review_order)
+        self.follow_tasks: asyncio.TaskGroup
+        self.merger = MergeExecutor(config.merge_workers)
+        self.journal = Journal(state_dir() / "journal.sqlite")
+        if args.forget:
+            self.journal.forget()
+        # PRs that are merged or closed (or queued to be) in this run
+        self.followed_up: set[tuple[str, str, int]] = set()
+        self.open_prs = OpenPrIndex()
+        self.registry = PrRegistry()
+        self.store = PrStore(cache_dir() / "prs.sqlite" if args.cache else None)
+        self.warnings: list[str] = []
+        self.search_planner = SearchPlanner(
+            self.search_page,
+            self.warnings.append,
+            concurrency=config.search_concurrency,
+        )
+        self.title_group_slots = asyncio.Semaphore(config.title_group_concurrency)
+        # Keyed by (owner, repo, number, head sha)
+        self.diffs: dict[tuple[str, str, int, str], Task[str]] = {}
+        # One representative diff per fingerprint, the other copies aren't kept
+        self.diff_texts: dict[str, str] = {}
+        # Head commits (owner, repo, sha) that had no statuses or check runs when
+        #  they were polled, which counts as a success but isn't final yet
+        self.without_checks: set[tuple[str, str, str]] = set()
+        self.renderer = Renderer(config.render_workers)
+        self.poller = StatusPoller(
+            self.get_head_sha, self.get_statuses, rate=config.status_poll_rate
+        )
+        self.auto_merger = AutoMergeReconciler(
+            self.wait_for_checks, self.auto_merge_state, self.on_auto_merge_outcome
+        )
+        self.quit = Event()
+        # Only needed for merging, so looked up while the search runs
+        self.login: Task[str]
+        self.report = Report()
+        self.exit_code = 0
+
+    def client(self, token: str) -> GitHub[TokenAuthStrategy]:
+        request_hooks = [self.governor.on_request]
+        if self.tracer.enabled:
+            request_hooks.append(self.tracer.on_request)
+        response_hooks = [self.governor.on_response]
+        if self.tracer.enabled:
+            response_hooks.append(self.tracer.on_response)
+        return GitHub(
+            token,
+            base_url=config.api_url,
+            cache_strategy=self.cache,
+            http_cache=self.args.cache,
+            throttler=self.governor,
+            auto_retry=self.governor.retry,
+            async_transport=transport(config.max_concurrency, http2=config.http2),
+            async_event_hooks={"request": request_hooks, "response": response_hooks},
+        )
+
+    async def run(self) -> None:
+        try:
+            with self.tracer.span("token"):
+                self.gh = self.client(await asyncio.wrap_future(self.token))
+            # Keep one client open for all requests, so connections are reused
+            #  and streamed responses stay readable after the request returns
+            async with self.gh:
+                with self.tracer.span("run"):
+                    await self.run_inner()
+        finally:
+            await self.cache.acleanup()
+            self.journal.close()
+            self.store.close()
+            if self.args.profile is not None:
+                self.tracer.write(self.args.profile)
+                self.tracer.print_summary()
+
+        if self.args.batch:
+            if self.merger.progress.failed:
+                self.exit_code |= 1
+            if self.args.report is None:
+                self.report.dump(sys.stdout, self.warnings, self.merger.progress)
+            else:
+                with self.args.report.open("w") as file:
+                    self.report.dump(file, self.warnings, self.merger.progress)
+            return
+
+        for warning in self.warnings:
+            print(f"WARNING: {warning}")
+
+    async def run_inner(self) -> None:
+        async with asyncio.TaskGroup() as self.follow_tasks:
+            self.login = self.follow_tasks.create_task(self.get_login())
+            merger_task = self.follow_tasks.create_task(self.merger.run())
+            # Merges and closes that didn't finish last time
+            resume_tasks = [
+                self.follow_tasks.create_task(
+                    self.resume(owner, repo, number, action, sha)
+                )
+                for owner, repo, number, action, sha in self.journal.pending()
+            ]
+            ui_task = asyncio.create_task(
+                self.batch() if self.args.batch else self.ui()
+            )
+
+            # We care about this task being lost if we quit,
+            # so we need to cancel it (if we quit)
+            queue_fill_task: Future[list[None]] | Task[object]
+            if self.urls:
+                queue_fill_task = asyncio.create_task(self.do_pr_urls(self.urls))
+            else:
+                queue_fill_task = asyncio.gather(*[
+                    self.do_pr_query(pr_query_data) for pr_query_data in pr_queries
+                ])
+            # We don't care about this task being lost if we quit
+            quit_task = asyncio.create_task(self.quit.wait())
+            # If the queue is filled or the user wants to quit...
+            await asyncio.wait(
+                [queue_fill_task, quit_task], return_when=asyncio.FIRST_COMPLETED
+            )
+            if self.quit.is_set():
+                queue_fill_task.cancel()
+                # suppress traceback
+                with contextlib.suppress(asyncio.CancelledError):
+                    await queue_fill_task
+
+            # We don't care about this task being lost if we quit
+            queue_empty_task = asyncio.create_task(self.queue.join())
+            # If the queue is empty or the user wants to quit...
+            await asyncio.wait(
+                [queue_empty_task, quit_task], return_when=asyncio.FIRST_COMPLETED
+            )
+            # Let the ui task know we're done (if the queue was empty)
+            self.queue.close()
+            await ui_task
+
+            # Resumed follow-ups are only submitted once their checks are known, so
+            #  wait for that before the merger is stopped. If we quit, they're
+            #  resumed next time.
+            if self.quit.is_set():
+                for task in resume_tasks:
+                    _ = task.cancel()
+            elif resume_tasks and not self.args.batch:
+                print("Waiting for the checks of resumed follow-ups...")
+            if resume_tasks:
+                _ = await asyncio.wait(resume_tasks)
+
+            if self.args.batch:
+                await self.merger.join(lambda _progress: None)
+            else:
+                print("Waiting for last follow-up tasks to complete...")
+                await self.merger.join(print_progress)
+                print()
+            if self.auto_merger.tasks and not self.args.batch:
+                print("Waiting for auto-merges...")
+            await self.auto_merger.close(config.auto_merge_wait)
+            _ = merger_task.cancel()
+
+    async def get_login(self) -> str:
+        with self.tracer.span("login"):
+            return (
+                await self.gh.rest.users.async_get_authenticated()
+            ).parsed_data.login
+
+    async def do_pr_query(self, pr_query_data: dict[str, str]) -> None:
+        pr_query = pr_query_data["query"]
+
+        all_prs: Iterable[Pr]
+        with self.tracer.span("search", query=pr_query) as tags:
+            all_prs = await self.sync_prs(f"{config.repo_query} {pr_query}")
+            tags["prs"] = len(all_prs)
+        # Before filtering, the other PRs are still open
+        self.open_prs.add(all_prs)
+
+        if "head_branch_regex" in pr_query_data:
+            all_prs = (
+                pr
+                for pr in all_prs
+                if re.match(pr_query_data["head_branch_regex"], pr.head_ref)
+            )
+
+        await self.do_pr_set(all_prs)
+
+    async def sync_prs(self, query: str) -> list[Pr]:
+        # The open PRs matching the query, see `PrStore`
+        started = time.time()
+        last_sync = self.store.last_sync(query)
+        if last_sync is None or started - last_sync[1] > FULL_SYNC_INTERVAL:
+            prs = await self.search(f"is:pr state:open {query}")
+            self.store.replace(query, prs, started)
+            return prs
+
+        since = time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(last_sync[0] - SYNC_MARGIN)
+        )
+        updated, closed = await asyncio.gather(
+            self.search(f"is:pr state:open {query} updated:>{since}"),
+            self.search(f"is:pr state:closed {query} updated:>{since}"),
+        )
+        self.store.update(query, updated, closed, started)
+        return self.store.prs(query)
+
+    async def search(self, query: str) -> list[Pr]:
+        try:
+            return await self.search_prs(query)
+        except (GraphQLFailed, RequestFailed) as err:
+            self.warnings.append(
+                f"GraphQL search failed, fell back to REST for '{query}': {err}"
+            )
+            return await self.search_prs_rest(query)
+
+    async def search_prs(self, query: str) -> list[Pr]:
+        # One request per 100 PRs, instead of two requests per PR
+        return [
+            Pr.from_graphql(node) for node in await self.search_planner.search(query)
+        ]
+
+    async def search_page(self, query: str, cursor: str | None) -> Search:
+        return cast(
+            "SearchResult",
+            await self.gh.graphql.arequest(
+                SEARCH_PRS, variables={"query": query, "cursor": cursor}
+            ),
+        )["search"]
+
+    async def search_prs_rest(self, query: str) -> list[Pr]:
+        return await asyncio.gather(*[
+            self.registry.fetch(
+                (*repository_name(pr.repository_url), pr.number),
+                functools.partial(self.get_pr, pr),
+            )
+            async for pr in self.gh.rest.paginate(
+                self.gh.rest.search.async_issues_and_pull_requests,
+                q=query,
+                per_page=PER_PAGE,
+                map_func=lambda r: r.parsed_data.items,
+            )
+        ])
+
+    async def do_pr_urls(self, urls: list[str]) -> None:
+        all_prs: Iterable[Pr] = await asyncio.gather(*[
+            self.get_pr_from_url(url) for url in urls
+        ])
+        self.open_prs.add(all_prs)
+
+        await self.do_pr_set(all_prs)
+
+    async def get_pr_from_url(self, url: str) -> Pr:
+        url = url.removeprefix("https://github.com/")
+        url, *_ = url.split("#", maxsplit=1)
+        owner, repo, _pull, number, *_rest = url.split("/", maxsplit=4)
+        return await self.registry.fetch(
+            (owner, repo, int(number)),
+            lambda: self.get_pr_from_rest(owner, repo, int(number)),
+        )
+
+    async def get_pr_from_rest(self, owner: str, repo: str, number: int) -> Pr:
+        return Pr.from_rest(
+            (await self.gh.rest.pulls.async_get(owner, repo, number)).parsed_data
+        )
+
+    async def do_pr_set(self, all_prs: Iterable[Pr]) -> None:
+        # PRs that were found by another query (or twice in the URLs) are
+        #  already taken care of
+        title_groups = group_by(lambda x: x.title, self.registry.claim(all_prs))
+
+        # Title groups are processed concurrently, and each one is put into the
+        #  queue as soon as it's ready, so one slow CI run doesn't hold up the rest
+        async with asyncio.TaskGroup() as tg:
+            for title, title_prs in title_groups.items():
+                # If we specified a title and it's not in here:
+                if self.title and self.title not in title:
+                    continue  # Skip
+
+                _ = tg.create_task(self.do_title_group(title, title_prs))
+
+    async def do_title_group(self, title: str, title_prs: Sequence[Pr]) -> None:
+        with self.tracer.span("title group", title=title, prs=len(title_prs)):
+            await self.do_title_group_inner(title, title_prs)
+
+    async def do_title_group_inner(self, title: str, title_prs: Sequence[Pr]) -> None:
+        # Start downloading the diffs while the checks are running
+        for pr in title_prs:
+            _ = self.prefetch_diff(pr, pr.head_sha)
+
+        # With auto-merge, PRs with pending checks can be accepted already
+        results = await asyncio.gather(*[
+            self.wait_for_status(pr, pending_ok=config.auto_merge) for pr in title_prs
+        ])
+        # Only now, waiting for the checks doesn't take a slot
+        async with self.title_group_slots:
+            await self.build_title_group(title, title_prs, results)
+
+    async def build_title_group(
+        self, title: str, title_prs: Sequence[Pr], results: Sequence[tuple[Status, str]]
+    ) -> None:
+        statuses = [status for status, _sha in results]
+        shas = [sha for _status, sha in results]
+
+        # New commits can get pushed by pre-commit.ci and similar, in which case
+        #  the prefetched diff is outdated and we download it again
+        fingerprints = await asyncio.gather(*[
+            self.take_diff(pr, sha)
+            for pr, (_status, sha) in zip(title_prs, results, strict=True)
+        ])
+
+        title_prs_full = map(
+            FullPr, title_prs, shas, fingerprints, statuses, strict=True
+        )
+        diff_groups: dict[str, list[FullPr]] = group_by(
+            lambda x: x.fingerprint, title_prs_full
+        )
+
+        if not self.args.batch:
+            for fingerprint, diff_prs in diff_groups.items():
+                if self.will_show(title, diff_prs):
+                    self.renderer.prefetch(fingerprint, self.diff_texts[fingerprint])
+
+        # Make sure to put an entire title group into the queue at once,
+        # without any awaits in between
+        self.queue.put([
+            (title, self.diff_texts[fingerprint], diff_prs)
+            for fingerprint, diff_prs in diff_groups.items()
+        ])
+
+    def will_show(self, title: str, diff_prs: Sequence[FullPr]) -> bool:
+        # Whether `ui` will (most likely) show this diff group, see `ui_diff_group`
+        if self.args.skip_fail and any(self.blocked(pr.status) for pr in diff_prs):
+            return False
+        return self.journal.decision(title, diff_prs[0].fingerprint) is None
+
+    @staticmethod
+    def blocked(status: Status) -> bool:
+        # Whether the checks keep the PR from being merged. Pending checks don't
+        #  with auto-merge, see `accept`
+        state, _fail_example = status
+        return state != "success" and not (config.auto_merge and state == "pending")
+
+    async def wait_for_status(
+        self, pr: Pr, *, pending_ok: bool = False
+    ) -> tuple[Status, str]:
+        with self.tracer.span("wait_for_status", repo=pr.full_name) as tags:
+            _fingerprint, status = self.store.head(pr, pr.head_sha)
+            if status is not None and status[0] == "success":
+                # Checks that passed on a commit don't fail later
+                result = status, pr.head_sha
+            else:
+                result = await self.poller.wait(pr, pending_ok=pending_ok)
+                (state, _fail_example), sha = result
+                # Not if there were no checks at all, CI may not have started yet
+                without_checks = (pr.owner, pr.repo, sha) in self.without_checks
+                if state != "pending" and not without_checks:
+                    self.store.set_status(pr, sha, result[0])
+            (tags["status"], _fail_example), _sha = result
+            return result
+
+    async def wait_for_checks(self, pr: Pr) -> str:
+        (state, _fail_example), _sha = await self.wait_for_status(pr)
+        return state
+
+    def prefetch_diff(self, pr: Pr, sha: str) -> Task[str]:
+        key = (pr.owner, pr.repo, pr.number, sha)
+        if key not in self.diffs:
+            self.diffs[key] = asyncio.create_task(self.get_diff(pr, sha))
+        return self.diffs[key]
+
+    async def take_diff(self, pr: Pr, sha: str) -> str:
+        if sha != pr.head_sha:
+            stale = self.diffs.pop((pr.owner, pr.repo, pr.number, pr.head_sha), None)
+            if stale is not None:
+                _ = stale.cancel()
+        task = self.prefetch_diff(pr, sha)
+        try:
+            return await task
+        finally:
+            del self.diffs[pr.owner, pr.repo, pr.number, sha]
+
+    async def get_head_sha(self, pr: Pr) -> str:
+        # A single request (and a 304 if nothing changed), instead of paging
+        #  through all commits of the PR
+        return (
+            await self.gh.rest.pulls.async_get(
+                owner=pr.owner, repo=pr.repo, pull_number=pr.number
+            )
+        ).parsed_data.head.sha
+
+    async def get_statuses(
+        self, heads: Sequence[tuple[Pr, str]]
+    ) -> list[Status | BaseException]:
+        # An error of a single head (in the REST fallbacks) only fails its own job
+        if self.poller.batch_size > 1:
+            try:
+                repositories = await self.get_rollups(heads)
+            except GraphQLFailed as err:
+                self.warnings.append(
+                    f"GraphQL status rollup failed, fell back to REST: {err}"
+                )
+                # From now on, since it takes two or more requests per PR
+                self.poller.batch_size = 1
+            else:
+                return await asyncio.gather(
+                    *[
+                        self.get_rollup_status(pr, sha, repository)
+                        for (pr, sha), repository in zip(
+                            heads, repositories, strict=True
+                        )
+                    ],
+                    return_exceptions=True,
+                )
+        return await asyncio.gather(
+            *itertools.starmap(self.get_status, heads), return_exceptions=True
+        )
+
+    async def get_rollups(
+        self, heads: Sequence[tuple[Pr, str]]
+    ) -> list[RollupRepository | None]:
+        # One request for up to 100 head commits, instead of two (or more) each
+        variables: dict[str, object] = {}
+        for i, (pr, sha) in enumerate(heads):
+            variables |= {f"owner{i}": pr.owner, f"repo{i}": pr.repo, f"sha{i}": sha}
+        try:
+            data = await self.gh.graphql.arequest(status_rollup(len(heads)), variables)
+        except GraphQLFailed as err:
+            # For example a deleted commit, it's None in the partial result
+            if err.response.data is None:
+                raise
+            data = err.response.data
+        result = cast("dict[str, RollupRepository | None]", data)
+        return [result[f"head{i}"] for i in range(len(heads))]
+
+    async def get_rollup_status(
+        self, pr: Pr, sha: str, repository: RollupRepository | None
+    ) -> Status:
+        commit = None if repository is None else repository["object"]
+        if commit is None:
+            # The REST endpoints raise the error
+            return await self.get_status(pr, sha)
+        rollup = commit["statusCheckRollup"]
+        if rollup is not None and rollup["contexts"]["pageInfo"]["hasNextPage"]:
+            # Over 100 statuses and check runs, the REST endpoints page through them
+            return await self.get_status(pr, sha)
+        if rollup is None or not rollup["contexts"]["nodes"]:
+            self.without_checks.add((pr.owner, pr.repo, sha))
+        else:
+            self.without_checks.discard((pr.owner, pr.repo, sha))
+        return rollup_status(rollup)
+
+    async def get_status(self, pr: Pr, sha: str) -> Status:
+        status = await self.gh.rest.repos.async_get_combined_status_for_ref(
+            owner=pr.owner,
+            repo=pr.repo,
+            ref=sha,
+        )
+        status_state = status.parsed_data.state
+        if status_state == "pending" and status.parsed_data.total_count == 0:
+            status_state = "success"
+
+        check_runs = [
+            (check_run.conclusion, check_run.html_url)
+            async for check_run in self.gh.rest.paginate(
+                self.gh.rest.checks.async_list_for_ref,
+                owner=pr.owner,
+                repo=pr.repo,
+                ref=sha,
+                per_page=PER_PAGE,
+                map_func=lambda x: x.parsed_data.check_runs,
+            )
+        ]
+        if status.parsed_data.total_count == 0 and not check_runs:
+            self.without_checks.add((pr.owner, pr.repo, sha))
+        else:
+            self.without_checks.discard((pr.owner, pr.repo, sha))
+        return combine(status_state, check_runs_state(check_runs))
+
+    async def get_pr(self, pr_issue: IssueSearchResultItem) -> Pr:
+        with self.tracer.span("get_pr", number=pr_issue.number):
+            return await self.get_pr_inner(pr_issue)
+
+    async def get_pr_inner(self, pr_issue: IssueSearchResultItem) -> Pr:
+        repository = await self.gh.arequest("GET", pr_issue.repository_url)
+        return Pr.from_rest(
+            (
+                await self.gh.rest.pulls.async_get(
+                    owner=repository.parsed_data["owner"]["login"],
+                    repo=repository.parsed_data["name"],
+                    pull_number=pr_issue.number,
+                )
+            ).parsed_data
+        )
+
+    async def get_diff(self, pr: Pr, sha: str) -> str:
+        # The diff of a head commit doesn't change, so it's kept in the PR index
+        fingerprint, _status = self.store.head(pr, sha)
+        if fingerprint is not None:
+            diff = self.store.diff(fingerprint)
+            if diff is not None:
+                _ = self.diff_texts.setdefault(fingerprint, diff)
+                return fingerprint
+        with self.tracer.span("get_diff", repo=pr.full_name):
+            fingerprint = await self.get_diff_inner(pr)
+        self.store.set_diff(pr, sha, fingerprint, self.diff_texts[fingerprint])
+        return fingerprint
+
+    async def get_diff_inner(self, pr: Pr) -> str:
+        # Returns the fingerprint of the normalized diff, see `self.diff_texts`
+        resp = await self.gh.arequest(
+            "GET",
+            pr.url,
+            headers={
+                "Accept": "application/vnd.github.diff",
+            },
+            stream=True,
+        )
+        fingerprint = hashlib.sha256()
+        lines: list[str] = []
+        try:
+            async for line in resp.raw_response.aiter_lines():
+                # Index lines contain the blob hashes, which differ between repos
+                if line.startswith("index"):
+                    continue
+                fingerprint.update(line.encode())
+                fingerprint.update(b"\n")
+                lines.append(line)
+        finally:
+            await resp.raw_response.aclose()
+
+        key = fingerprint.hexdigest()
+        # Only the first diff with this fingerprint is kept for display
+        _ = self.diff_texts.setdefault(key, "\n".join(lines))
+        return key
+
+    async def ui(self) -> None:
+        while not self.quit.is_set():
+            clear()
+            print("Waiting for diffgroup...")
+            entry = await self.queue.get()
+            if entry is None:
+                return
+
+            title, diff, diff_prs = entry.group
+            if (decision := self.apply_remembered(title, diff_prs)) is not None:
+                self.warnings.append(
+                    f"Remembered '{decision}' for '{title}' in "
+                    f"{" ".join(pr.pr.full_name for pr in diff_prs)}"
+                )
+            else:
+                result = await self.ui_diff_group(title, diff, diff_prs)
+                if result == "quit":
+                    self.quit.set()
+                    self.exit_code |= 1
+                elif result == "close":
+                    # Close all remaining PRs in the title group, including the
+                    #  current diff group
+                    for _title, _diff, group_prs in [
+                        entry.group,
+                        *self.queue.take_title_group(entry),
+                    ]:
+                        self.journal.decide(title, group_prs[0].fingerprint, "close")
+                        for pr in group_prs:
+                            self.follow_up(pr.pr, "close", pr.sha)
+
+            self.queue.task_done()
+
+    async def batch(self) -> None:
+        # Like `ui`, but without a user
+        while (entry := await self.queue.get()) is not None:
+            title, diff, diff_prs = entry.group
+            if (decision := self.apply_remembered(title, diff_prs)) is not None:
+                self.report.decide(
+                    title,
+                    [pr.pr.html_url for pr in diff_prs],
+                    decision,
+                    "remembered decision",
+                )
+            else:
+                self.batch_diff_group(title, diff, diff_prs)
+            self.queue.task_done()
+
+    def batch_diff_group(
+        self, title: str, diff: str, diff_prs: Sequence[FullPr]
+    ) -> None:
+        action, rule = decide(config.policy, diff, [pr.pr for pr in diff_prs])
+        reason = "no matching policy rule" if rule is None else f"policy rule {rule}"
+        failing = [pr for pr in diff_prs if self.blocked(pr.status)]
+        if action == "accept" and failing:
+            # Never merge without passing checks, whatever the rule says. Like
+            #  --skip-fail in `ui_diff_group`, this fails the run.
+            action = "skip"
+            reason = (
+                f"status check: {failing[0].status[0]} for {failing[0].pr.html_url}"
+            )
+            self.exit_code |= 1
+
+        self.report.decide(title, [pr.pr.html_url for pr in diff_prs], action, reason)
+        for pr in diff_prs:
+            match action:
+                case "accept":
+                    self.accept(pr)
+                case "close":
+                    self.follow_up(pr.pr, "close", pr.sha)
+                case "skip":
+                    pass
+
+    def apply_remembered(
+        self, title: str, diff_prs: Sequence[FullPr]
+    ) -> Decision | None:
+        # Returns the decision if there was one, and the diff group is done with
+        decision = self.journal.decision(title, diff_prs[0].fingerprint)
+        match decision:
+            case "accept":
+                # The checks of these PRs may still fail
+                if any(self.blocked(pr.status) for pr in diff_prs):
+                    return None
+                for pr in diff_prs:
+                    self.accept(pr)
+            case "close":
+                for pr in diff_prs:
+                    self.follow_up(pr.pr, "close", pr.sha)
+            case "skip" | None:
+                pass
+        return decision
+
+    async def ui_diff_group(  # ruff:ignore[complex-structure, too-many-branches]
+        self,
+        title: str,
+        diff: str,
+        diff_prs: Sequence[FullPr],
+    ) -> Literal["quit", "close"] | None:
+        def print_header() -> None:
+            clear()
+            print(title)
+            print(" ".join(pr.pr.full_name for pr in diff_prs))
+            print(f"API budget: {self.governor.summary()}")
+            print(f"Follow-up: {self.merger.progress}")
+            print_line()
+
+        print_header()
+
+        for pr in diff_prs:
+            status, fail_example = pr.status
+            if status == "pending" and config.auto_merge:
+                print(
+                    f"Checks pending, accepting enables auto-merge for {pr.pr.html_url}"
+                )
+            elif status != "success":
+                if self.args.skip_fail:
+                    print(f"Status check: {status}! Opening and skipping...")
+                    webbrowser.open(pr.pr.html_url)
+                    if fail_example is not None:
+                        webbrowser.open(fail_example)
+                    self.exit_code |= 1
+                    return None
+                print(f"WARNING! Status check: {status} for {pr.pr.html_url}")
+
+        with self.tracer.span("delta"):
+            rendered = await self.renderer.take(diff_prs[0].fingerprint, diff)
+        await show(rendered)
+        print()
+
+        while True:
+            with self.tracer.span("user input"):
+                answer = await areadchar(prompt(config.keybinds))
+            print()
+            try:
+                action = config.keybinds[answer]
+            except KeyError:
+                print("Invalid answer")
+                continue
+
+            # Mypy checks that this is exhaustive
+            match action:
+                case "accept":
+                    self.journal.decide(title, diff_prs[0].fingerprint, "accept")
+                    for pr in diff_prs:
+                        self.accept(pr)
+                    break
+                case "close":
+                    if (
+                        await areadchar(
+                            "This will close all PRs in the **titlegroup**. "
+                            "Are you sure? (y/n) "
+                        )
+                        != "y"
+                    ):
+                        continue
+                    return "close"
+                case "open":
+                    print("Opening random PR from diff group...")
+                    webbrowser.open(diff_prs[0].pr.html_url)
+                    continue
+                case "skip":
+                    self.journal.decide(title, diff_prs[0].fingerprint, "skip")
+                    break
+                case "quit":
+                    return "quit"
+
+        clear()
+        return None
+
+    def accept(self, pr: FullPr) -> None:
+        # PRs with pending checks are merged by GitHub once they pass
+        action: FollowUp = "auto-merge" if pr.status[0] == "pending" else "merge"
+        self.follow_up(pr.pr, action, pr.sha)
+
+    def follow_up(self, pr: Pr, action: FollowUp, sha: str) -> None:
+        # `sha` is the head commit that was reviewed
+        key = (pr.owner, pr.repo, pr.number)
+        if key in self.followed_up:
+            # For example resumed from the last run, and found again
+            return
+        self.followed_up.add(key)
+        self.journal.add_pending(pr, action, sha)
+        f: Callable[[Pr], Awaitable[bool]]
+        match action:
+            case "merge":
+                f = functools.partial(self.merge, sha=sha)
+            case "auto-merge":
+                f = functools.partial(self.auto_merge, sha=sha)
+            case "close":
+                f = self.close
+
+        async def run(pr: Pr) -> bool:
+            with self.tracer.span(action, repo=pr.full_name) as tags:
+                ok = tags["ok"] = await f(pr)
+            # Not when interrupted, so it's resumed next time
+            self.journal.remove_pending(pr.owner, pr.repo, pr.number)
+            return ok
+
+        self.merger.submit(pr, run)
+
+    async def resume(
+        self, owner: str, repo: str, number: int, action: FollowUp, sha: str
+    ) -> None:
+        try:
+            data = (await self.gh.rest.pulls.async_get(owner, repo, number)).parsed_data
+        except RequestFailed as err:
+            self.warnings.append(
+                f"Failed to resume {action} of {owner}/{repo}#{number} : {err}"
+            )
+            self.journal.remove_pending(owner, repo, number)
+            return
+        if data.state != "open":
+            # It did finish, or someone else took care of it
+            self.journal.remove_pending(owner, repo, number)
+            return
+        pr = Pr.from_rest(data)
+        if action != "close":
+            # Like a PR that was just found, the checks may have failed since
+            status, head_sha = await self.wait_for_status(
+                pr, pending_ok=action == "auto-merge"
+            )
+            if head_sha != sha:
+                self.warnings.append(
+                    f"Didn't resume {action} of {pr.html_url}, it has new commits "
+                    "since it was reviewed"
+                )
+                self.journal.remove_pending(owner, repo, number)
+                return
+            if self.blocked(status):
+                self.warnings.append(
+                    f"Didn't resume {action} of {pr.html_url}, status check: "
+                    f"{status[0]}"
+                )
+                self.journal.remove_pending(owner, repo, number)
+                return
+            action = "auto-merge" if status[0] == "pending" else "merge"
+        self.warnings.append(f"Resumed {action} of {pr.html_url}")
+        self.follow_up(pr, action, sha)
+
+    async def approve(self, pr: Pr) -> bool:
+        if pr.author == await self.login:
+            return True
+        try:
+            await self.gh.rest.pulls.async_create_review(
+                owner=pr.owner,
+                repo=pr.repo,
+                pull_number=pr.number,
+                event="APPROVE",
+            )
+        except RequestFailed as err:
+            self.warnings.append(
+                f"Failed to approve, and thus didn't merge, {pr.html_url} : {err}"
+            )
+            return False
+        return True
+
+    async def merge(self, pr: Pr, *, sha: str) -> bool:
+        return await self.approve(pr) and await self.merge_approved(pr, sha=sha)
+
+    async def merge_approved(self, pr: Pr, *, sha: str) -> bool:
+        try:
+            # Another merge into the same base branch may have just finished.
+            #  GitHub refuses the merge if the head moved since `sha` was reviewed.
+            await retry_transient(
+                lambda: self.gh.rest.pulls.async_merge(
+                    owner=pr.owner,
+                    repo=pr.repo,
+                    pull_number=pr.number,
+                    sha=sha,
+                    merge_method="squash",
+                )
+            )
+        except RequestFailed as err:
+            self.warnings.append(f"Failed to merge {pr.html_url} : {err}")
+            return False
+        self.open_prs.remove(pr)
+        self.store.remove(pr)
+
+        try:
+            await self.delete_branch(pr)
+        except RequestFailed as err:
+            self.warnings.append(f"Failed to delete branch for {pr.html_url} : {err}")
+        return True
+
+    async def auto_merge(self, pr: Pr, *, sha: str) -> bool:
+        if not await self.approve(pr):
+            return False
+        try:
+            _ = await self.gh.graphql.arequest(
+                ENABLE_AUTO_MERGE, {"id": pr.node_id, "sha": sha}
+            )
+        except (GraphQLFailed, RequestFailed) as err:
+            if "clean status" in str(err):
+                # The checks passed in the meantime, so it can be merged right away
+                return await self.merge_approved(pr, sha=sha)
+            self.warnings.append(
+                f"Failed to enable auto-merge for {pr.html_url} : {err}"
+            )
+            return False
+        self.auto_merger.follow(pr)
+        return True
+
+    async def auto_merge_state(self, pr: Pr) -> State:
+        data = (
+            await self.gh.rest.pulls.async_get(
+                owner=pr.owner, repo=pr.repo, pull_number=pr.number
+            )
+        ).parsed_data
+        if data.merged:
+            return "merged"
+        if data.state != "open":
+            return "closed"
+        return "disabled" if data.auto_merge is None else "enabled"
+
+    async def on_auto_merge_outcome(
+        self, pr: Pr, outcome: Outcome, reason: str
+    ) -> None:
+        self.report.auto_merge(pr.html_url, outcome, reason)
+        match outcome:
+            case "merged":
+                self.warnings.append(f"Auto-merged {pr.html_url}")
+                self.open_prs.remove(pr)
+                self.store.remove(pr)
+                try:
+                    await self.delete_branch(pr)
+                except RequestFailed as err:
+                    self.warnings.append(
+                        f"Failed to delete branch for {pr.html_url} : {err}"
+                    )
+            case "blocked":
+                self.warnings.append(f"Auto-merge of {pr.html_url} blocked: {reason}")
+            case "pending":
+                self.warnings.append(
+                    f"Auto-merge of {pr.html_url} is still {reason}, GitHub merges "
+                    "it when they pass"
+                )
+
+    async def close(self, pr: Pr) -> bool:
+        try:
+            await self.gh.rest.pulls.async_update(
+                owner=pr.owner,
+                repo=pr.repo,
+                pull_number=pr.number,
+                state="closed",
+            )
+        except RequestFailed as err:
+            self.warnings.append(f"Failed to close {pr.html_url} : {err}")
+            return False
+        self.open_prs.remove(pr)
+        self.store.remove(pr)
+
+        self.warnings.append(f"Closed {pr.html_url}")
+
+        try:
+            await self.delete_branch(pr)
+        except RequestFailed as err:
+            self.warnings.append(f"Failed to delete branch for {pr.html_url} : {err}")
+        return True
+
+    async def delete_branch(self, pr: Pr, *, force: bool = False) -> None:
+        assert pr.head_owner is not None  # ruff:ignore[assert]
+        assert pr.head_repo is not None  # ruff:ignore[assert]
+        # Only checks the PRs found during discovery. Bots open every PR
+        #  from its own branch, so that's enough in practice
+        if not force and self.open_prs.head_in_use(pr):
+            self.warnings.append(
+                f"Head branch of PR {pr.html_url} is referenced "
+                f"by open pull requests, didn't delete it"
+            )
+            return
+        await self.gh.rest.git.async_delete_ref(
+            owner=pr.head_owner,
+            repo=pr.head_repo,
+            ref=f"heads/{pr.head_ref}",
+        )
+
+
+def repository_name(repository_url: str) -> tuple[str, str]:
+    # https://api.github.com/repos/{owner}/{repo}
+    *_, owner, repo = repository_url.rsplit("/", maxsplit=2)
+    return owner, repo
+
+
+def print_progress(progress: Progress) -> None:
+    print(f"\r{progress}", end="", flush=True)
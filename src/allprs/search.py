@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from allprs.queries import PrNode, Search
+
+
+# https://docs.github.com/en/rest/search/search#about-search
+MAX_RESULTS = 1000
+# Shards are made this big, so most of them don't need to be split again
+SHARD_SIZE = 800
+# Nothing on GitHub was created before this
+EPOCH = datetime(2008, 1, 1, tzinfo=UTC)
+OWNER_QUALIFIERS = ("user:", "org:")
+
+type Created = tuple[datetime, datetime]
+
+
+def owner_shards(query: str) -> list[str]:
+    # Multiple owners are OR-ed together, so the query can be split into one per owner
+    terms = query.split(" ")
+    owners = [term for term in terms if term.startswith(OWNER_QUALIFIERS)]
+    if len(owners) <= 1:
+        return [query]
+    rest = [term for term in terms if term not in owners]
+    return [" ".join([*rest, owner]) for owner in owners]
+
+
+def split_created(created: Created, parts: int) -> list[Created]:
+    # Into (at most) `parts` ranges of whole seconds, which don't overlap since the
+    #  end of a range is included in it
+    start, end = created
+    seconds = math.ceil((end - start).total_seconds())
+    bounds = sorted({
+        start + timedelta(seconds=seconds * i // parts) for i in range(parts + 1)
+    })
+    return [
+        (low, high - timedelta(seconds=1) if i < len(bounds) - 2 else high)
+        for i, (low, high) in enumerate(itertools.pairwise(bounds))
+    ]
+
+
+def format_created(created: Created) -> str:
+    return "created:" + "..".join(
+        date.strftime("%Y-%m-%dT%H:%M:%SZ") for date in created
+    )
+
+
+class SearchPlanner:
+    """
+    Split up searches that have more results than GitHub returns.
+
+    GitHub stops at 1,000 results, and silently drops the others. A search with more
+    results is split by owner (if it has several) and then by creation date, until
+    every shard fits. Shards run concurrently, but only a few at a time, since
+    search requests are throttled separately (and more strictly) by GitHub.
+    """
+
+    def __init__(
+        self,
+        search_page: Callable[[str, str | None], Awaitable[Search]],
+        warn: Callable[[str], None],
+        *,
+        concurrency: int,
+    ) -> None:
+        self.search_page = search_page
+        self.warn = warn
+        self.slots = asyncio.Semaphore(concurrency)
+
+    async def search(self, query: str) -> list[PrNode]:
+        return await self.search_shard(query, None, split_owners=True)
+
+    async def page(self, query: str, cursor: str | None) -> Search:
+        async with self.slots:
+            return await self.search_page(query, cursor)
+
+    async def search_shard(
+        self, query: str, created: Created | None, *, split_owners: bool = False
+    ) -> list[PrNode]:
+        shard_query = query if created is None else f"{query} {format_created(created)}"
+        page = await self.page(shard_query, None)
+        count = page["issueCount"]
+        if count > MAX_RESULTS:
+            shards = self.split(query, created, count, split_owners=split_owners)
+            if shards:
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [
+                        tg.create_task(self.search_shard(shard, shard_created))
+                        for shard, shard_created in shards
+                    ]
+                return [node for task in tasks for node in task.result()]
+            self.warn(
+                f"Search '{shard_query}' has {count} results, only got the first "
+                f"{MAX_RESULTS}"
+            )
+
+        nodes = list(page["nodes"])
+        while page["pageInfo"]["hasNextPage"]:
+            page = await self.page(shard_query, page["pageInfo"]["endCursor"])
+            nodes.extend(page["nodes"])
+        return nodes
+
+    @staticmethod
+    def split(
+        query: str, created: Created | None, count: int, *, split_owners: bool
+    ) -> list[tuple[str, Created | None]]:
+        # Returns no shards if it can't be split any further
+        if split_owners and len(owners := owner_shards(query)) > 1:
+            return [(owner, None) for owner in owners]
+        if created is None:
+            created = (EPOCH, datetime.now(UTC))
+        shards = split_created(created, math.ceil(count / SHARD_SIZE))
+        if len(shards) <= 1:
+            return []
+        return [(query, shard) for shard in shards]
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import contextlib
+import itertools
+import sqlite3
+from typing import TYPE_CHECKING
+
+from allprs.pr import Pr
+
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+    from pathlib import Path
+
+    from allprs.poller import Status
+
+
+# Every so often all PRs are searched again, to drop the ones that don't match the
+#  query anymore (for example because a label was removed)
+FULL_SYNC_INTERVAL = 24 * 60 * 60
+# The search index lags behind a bit, so updates are searched for from a bit before
+#  the last sync
+SYNC_MARGIN = 5 * 60
+# Bumped when the tables change, the index is rebuilt then
+SCHEMA_VERSION = 1
+
+
+class PrStore:
+    """
+    The open PRs of every query, kept between runs.
+
+    A query is only searched in full on the first run (and once a day). Other runs
+    only search for the PRs that were updated or closed since the last one, and use
+    the stored PRs for the rest. For every PR the diff fingerprint and checks of its
+    head commit are kept as well, so unchanged PRs don't need to be downloaded (or
+    polled, if their checks passed) again.
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        # In memory if None, so nothing is reused
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path or ":memory:", autocommit=True)
+        _ = self.connection.execute("PRAGMA journal_mode=WAL")
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            for table in ("syncs", "prs", "heads", "diffs"):
+                _ = self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+            _ = self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        _ = self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS syncs ("
+            " query TEXT PRIMARY KEY,"
+            " synced_at REAL NOT NULL,"
+            " full_synced_at REAL NOT NULL"
+            ")"
+        )
+        _ = self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS prs ("
+            " query TEXT NOT NULL,"
+            " owner TEXT NOT NULL,"
+            " repo TEXT NOT NULL,"
+            " number INTEGER NOT NULL,"
+            " node_id TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " author TEXT NOT NULL,"
+            " head_ref TEXT NOT NULL,"
+            " head_sha TEXT NOT NULL,"
+            " head_owner TEXT,"
+            " head_repo TEXT,"
+            " html_url TEXT NOT NULL,"
+            " PRIMARY KEY (query, owner, repo, number)"
+            ")"
+        )
+        _ = self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS heads ("
+            " owner TEXT NOT NULL,"
+            " repo TEXT NOT NULL,"
+            " number INTEGER NOT NULL,"
+            " sha TEXT NOT NULL,"
+            " fingerprint TEXT,"
+            " status TEXT,"
+            " fail_example TEXT,"
+            " PRIMARY KEY (owner, repo, number)"
+            ")"
+        )
+        _ = self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS diffs ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " diff TEXT NOT NULL"
+            ")"
+        )
+
+    @contextlib.contextmanager
+    def transaction(self) -> Generator[None]:
+        # The connection is in autocommit mode, so it's explicit
+        _ = self.connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            _ = self.connection.execute("ROLLBACK")
+            raise
+        _ = self.connection.execute("COMMIT")
+
+    def last_sync(self, query: str) -> tuple[float, float] | None:
+        # The last sync, and the last full sync
+        row = self.connection.execute(
+            "SELECT synced_at, full_synced_at FROM syncs WHERE query = ?", (query,)
+        ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def replace(self, query: str, prs: Iterable[Pr], synced_at: float) -> None:
+        with self.transaction():
+            _ = self.connection.execute("DELETE FROM prs WHERE query = ?", (query,))
+            self.add(query, prs)
+            _ = self.connection.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)",
+                (query, synced_at, synced_at),
+            )
+
+    def update(
+        self,
+        query: str,
+        updated: Iterable[Pr],
+        closed: Iterable[Pr],
+        synced_at: float,
+    ) -> None:
+        with self.transaction():
+            self.add(query, updated)
+            for pr in closed:
+                self.remove(pr)
+            _ = self.connection.execute(
+                "UPDATE syncs SET synced_at = ? WHERE query = ?", (synced_at, query)
+            )
+
+    def add(self, query: str, prs: Iterable[Pr]) -> None:
+        _ = self.connection.executemany(
+            "INSERT OR REPLACE INTO prs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    query,
+                    pr.owner,
+                    pr.repo,
+                    pr.number,
+                    pr.node_id,
+                    pr.title,
+                    pr.author,
+                    pr.head_ref,
+                    pr.head_sha,
+                    pr.head_owner,
+                    pr.head_repo,
+                    pr.html_url,
+                )
+                for pr in prs
+            ],
+        )
+
+    def remove(self, pr: Pr) -> None:
+        # From all queries, for example because we merged it
+        _ = self.connection.execute(
+            "DELETE FROM prs WHERE owner = ? AND repo = ? AND number = ?",
+            (pr.owner, pr.repo, pr.number),
+        )
+
+    def prs(self, query: str) -> list[Pr]:
+        rows = self.connection.execute(
+            "SELECT owner, repo, number, node_id, title, author, head_ref,"
+            " head_sha, head_owner, head_repo, html_url FROM prs WHERE query = ?",
+            (query,),
+        )
+        return list(itertools.starmap(Pr, rows))
+
+    def head(self, pr: Pr, sha: str) -> tuple[str | None, Status | None]:
+        # The fingerprint and the final status of this head commit, if we know them
+        row = self.connection.execute(
+            "SELECT fingerprint, status, fail_example FROM heads"
+            " WHERE owner = ? AND repo = ? AND number = ? AND sha = ?",
+            (pr.owner, pr.repo, pr.number, sha),
+        ).fetchone()
+        if row is None:
+            return None, None
+        fingerprint, status, fail_example = row
+        return fingerprint, None if status is None else (status, fail_example)
+
+    def set_status(self, pr: Pr, sha: str, status: Status) -> None:
+        self.set_head(pr, sha)
+        _ = self.connection.execute(
+            "UPDATE heads SET status = ?, fail_example = ?"
+            " WHERE owner = ? AND repo = ? AND number = ?",
+            (*status, pr.owner, pr.repo, pr.number),
+        )
+
+    def set_diff(self, pr: Pr, sha: str, fingerprint: str, diff: str) -> None:
+        self.set_head(pr, sha)
+        _ = self.connection.execute(
+            "UPDATE heads SET fingerprint = ?"
+            " WHERE owner = ? AND repo = ? AND number = ?",
+            (fingerprint, pr.owner, pr.repo, pr.number),
+        )
+        _ = self.connection.execute(
+            "INSERT OR IGNORE INTO diffs VALUES (?, ?)", (fingerprint, diff)
+        )
+
+    def set_head(self, pr: Pr, sha: str) -> None:
+        # What we knew about an older head commit doesn't apply anymore
+        _ = self.connection.execute(
+            "DELETE FROM heads"
+            " WHERE owner = ? AND repo = ? AND number = ? AND sha != ?",
+            (pr.owner, pr.repo, pr.number, sha),
+        )
+        _ = self.connection.execute(
+            "INSERT OR IGNORE INTO heads (owner, repo, number, sha)"
+            " VALUES (?, ?, ?, ?)",
+            (pr.owner, pr.repo, pr.number, sha),
+        )
+
+    def diff(self, fingerprint: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT diff FROM diffs WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def close(self) -> None:
+        # Drop what belongs to PRs that aren't open anymore
+        _ = self.connection.execute(
+            "DELETE FROM heads WHERE NOT EXISTS ("
+            " SELECT 1 FROM prs p WHERE p.owner = heads.owner"
+            " AND p.repo = heads.repo AND p.number = heads.number"
+            ")"
+        )
+        _ = self.connection.execute(
+            "DELETE FROM diffs WHERE fingerprint NOT IN ("
+            " SELECT fingerprint FROM heads WHERE fingerprint IS NOT NULL"
+            ")"
+        )
+        self.connection.close()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+    import httpx
+
+
+type Tag = str | int | float | bool | None
+
+# Turns API paths into endpoints, so requests to the same endpoint are grouped
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"/commits/[^/]+"), "/commits/{ref}"),
+    (re.compile(r"/git/refs?/heads/.+"), "/git/refs/heads/{ref}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{number}"),
+]
+
+
+def endpoint(request: httpx.Request) -> str:
+    path = request.url.path
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return f"{request.method} {path}"
+
+
+def repo_of(request: httpx.Request) -> str | None:
+    parts = request.url.path.split("/")
+    # /repos/{owner}/{repo}/...
+    return f"{parts[2]}/{parts[3]}" if len(parts) > 3 and parts[1] == "repos" else None  # ruff:ignore[magic-value-comparison]
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start: float  # Seconds since the tracer was created
+    duration: float
+    thread: int
+    tags: dict[str, Tag] = field(default_factory=dict)
+
+
+def percentile(durations: list[float], p: int) -> float:
+    if len(durations) == 1:
+        return durations[0]
+    return statistics.quantiles(durations, n=100, method="inclusive")[p - 1]
+
+
+def wall_time(spans: list[Span]) -> float:
+    # Time during which at least one of these spans was running. Concurrent
+    #  spans only count once, so this is how much they add to the total time.
+    total = 0.0
+    end = 0.0
+    for span in sorted(spans, key=lambda span: span.start):
+        span_end = span.start + span.duration
+        if span_end > end:
+            total += span_end - max(span.start, end)
+            end = span_end
+    return total
+
+
+class Tracer:
+    """
+    Record spans for phases of a run and for every API request.
+
+    Disabled unless `--profile` is passed, in which case the spans are written as a
+    Chrome trace (open it in https://ui.perfetto.dev) and summarized at exit.
+    """
+
+    def __init__(self, *, enabled: bool) -> None:
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self.threads: dict[int, int] = {}
+
+    def now(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def thread(self) -> int:
+        # One row in the trace per asyncio task (or thread, outside of the loop)
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = threading.get_ident()
+        return self.threads.setdefault(key, len(self.threads) + 1)
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, category: str = "phase", **tags: Tag
+    ) -> Generator[dict[str, Tag]]:
+        # Yields the tags, so they can be added to while the span runs
+        if not self.enabled:
+            yield tags
+            return
+        start = self.now()
+        try:
+            yield tags
+        finally:
+            self.spans.append(
+                Span(name, category, start, self.now() - start, self.thread(), tags)
+            )
+
+    async def on_request(self, request: httpx.Request) -> None:
+        request.extensions["allprs_start"] = self.now()
+
+    async def on_response(self, response: httpx.Response) -> None:
+        request = response.request
+        start: float = request.extensions["allprs_start"]
+        extensions = response.extensions
+        # A 304, which hishel turned back into the cached response
+        revalidated = bool(
+            extensions.get("hishel_from_cache") and extensions.get("hishel_revalidated")
+        )
+        self.spans.append(
+            Span(
+                endpoint(request),
+                "request",
+                start,
+                # Until the headers are received, streamed bodies are read later
+                self.now() - start,
+                self.thread(),
+                {
+                    "repo": repo_of(request),
+                    "status": 304 if revalidated else response.status_code,
+                    "bytes": int(response.headers.get("content-length", 0)),
+                    # 304 responses don't count against the rate limit
+                    "cost": 0 if revalidated else 1,
+                },
+            )
+        )
+
+    def write(self, path: Path) -> None:
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1_000_000,
+                "dur": span.duration * 1_000_000,
+                "pid": 1,
+                "tid": span.thread,
+                "args": span.tags,
+            }
+            for span in self.spans
+        ]
+        with path.open("w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def summary(self) -> str:
+        by_name: dict[tuple[str, str], list[Span]] = {}
+        for span in self.spans:
+            by_name.setdefault((span.category, span.name), []).append(span)
+
+        header = (
+            f"{"name":56} {"count":>6} {"p50":>8} {"p90":>8} {"p99":>8} "
+            f"{"total":>9} {"wall":>9} {"cost":>6}"
+        )
+        lines = [header]
+        for (_category, name), spans in sorted(
+            by_name.items(), key=lambda item: -wall_time(item[1])
+        ):
+            durations = [span.duration for span in spans]
+            cost = sum(
+                tag for span in spans if isinstance(tag := span.tags.get("cost"), int)
+            )
+            lines.append(
+                f"{name[:56]:56} {len(spans):6} "
+                f"{percentile(durations, 50):8.3f} {percentile(durations, 90):8.3f} "
+                f"{percentile(durations, 99):8.3f} {sum(durations):9.3f} "
+                f"{wall_time(spans):9.3f} {cost:6}"
+            )
+        lines.append(
+            f"Total run time: {self.now():.3f}s. Times are in seconds, wall is the "
+            "time during which at least one was running."
+        )
+        return "\n".join(lines)
+
+    def print_summary(self) -> None:
+        # To stderr, so it doesn't end up in the --batch report
+        print(self.summary(), file=sys.stderr)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import importlib.util
+
+import httpx
+
+
+# The most GitHub's REST API returns per page, instead of the default of 30
+PER_PAGE = 100
+# Statuses are polled every 5 to 60 seconds. httpx closes idle connections after 5
+#  seconds by default, so most polls would have to connect (and do a TLS handshake)
+#  again.
+KEEPALIVE_EXPIRY = 60
+
+
+def http2_available() -> bool:
+    # HTTP/2 needs h2, from the `http2` extra
+    return importlib.util.find_spec("h2") is not None
+
+
+def transport(max_connections: int, *, http2: bool) -> httpx.AsyncHTTPTransport:
+    # With HTTP/2, all requests are multiplexed over a single connection. Otherwise
+    #  every request in flight needs its own, so the pool has room for (and keeps
+    #  open) as many connections as there can be requests in flight
+    return httpx.AsyncHTTPTransport(
+        http2=http2 and http2_available(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
@@ -1,17 +1,16 @@
 from __future__ import annotations
 
+import functools
 from collections import defaultdict
 from shutil import get_terminal_size
 from typing import TYPE_CHECKING
 
-from prompt_toolkit import PromptSession
-from prompt_toolkit.key_binding import KeyBindings, KeyPressEvent
-from prompt_toolkit.patch_stdout import patch_stdout
-
 
 if TYPE_CHECKING:
     from collections.abc import Callable, Iterable, Mapping
 
+    from prompt_toolkit.key_binding import KeyBindings, KeyPressEvent
+
 
 def group_by[T, U](f: Callable[[T], U], it: Iterable[T]) -> dict[U, list[T]]:
     d = defaultdict(list)
@@ -28,18 +27,34 @@ def print_line() -> None:
     print("=" * get_terminal_size().columns)
 
 
-kb = KeyBindings()
+# prompt_toolkit is only imported once we ask for input, it takes a while to import
+#  and isn't used at all in --batch mode
+
+
+@functools.cache
+def key_bindings() -> KeyBindings:
+    from prompt_toolkit.key_binding import (  # ruff:ignore[import-outside-top-level]
+        KeyBindings,
+    )
+
+    kb = KeyBindings()
 
+    @kb.add("<any>")
+    def _(event: KeyPressEvent) -> None:
+        event.app.exit(result=event.key_sequence[0].key)
 
-@kb.add("<any>")
-def _(event: KeyPressEvent) -> None:
-    event.app.exit(result=event.key_sequence[0].key)
+    return kb
 
 
 async def areadchar(prompt: str = "") -> str:
+    from prompt_toolkit import PromptSession  # ruff:ignore[import-outside-top-level]
+    from prompt_toolkit.patch_stdout import (  # ruff:ignore[import-outside-top-level]
+        patch_stdout,
+    )
+
     session: PromptSession[str] = PromptSession()
     with patch_stdout():
-        return await session.prompt_async(prompt, key_bindings=kb)
+        return await session.prompt_async(prompt, key_bindings=key_bindings())
 
 
 def prompt(keybinds: Mapping[str, str]) -> str:
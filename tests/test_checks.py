@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+
+from allprs.checks import check_runs_state, combine, rollup_status
+
+
+def rollup(*contexts: dict[str, str | None]) -> dict[str, object]:
+    return {"contexts": {"nodes": list(contexts), "pageInfo": {"hasNextPage": False}}}
+
+
+def test_check_runs_state_empty() -> None:
+    assert check_runs_state([]) == ("success", None)
+
+
+@pytest.mark.parametrize("conclusion", ["success", "neutral", "skipped", "stale"])
+def test_check_runs_state_passing(conclusion: str) -> None:
+    assert check_runs_state([("success", "a"), (conclusion, "b")]) == ("success", None)
+
+
+@pytest.mark.parametrize(
+    "conclusion",
+    ["failure", "action_required", "cancelled", "timed_out", "startup_failure"],
+)
+def test_check_runs_state_failing(conclusion: str) -> None:
+    assert check_runs_state([("success", "a"), (conclusion, "b")]) == ("failure", "b")
+
+
+def test_check_runs_state_failure_wins_over_pending() -> None:
+    assert check_runs_state([(None, "a"), ("failure", "b"), (None, "c")]) == (
+        "failure",
+        "b",
+    )
+    assert check_runs_state([("success", "a"), (None, "b")]) == ("pending", None)
+
+
+def test_combine() -> None:
+    assert combine("success", ("success", None)) == ("success", None)
+    assert combine("pending", ("success", None)) == ("pending", None)
+    assert combine("failure", ("pending", None)) == ("failure", None)
+    assert combine("success", ("failure", "a")) == ("failure", "a")
+
+
+def test_rollup_status_without_checks() -> None:
+    assert rollup_status(None) == ("success", None)
+    assert rollup_status(rollup()) == ("success", None)
+
+
+def test_rollup_status_check_runs() -> None:
+    status = rollup_status(
+        rollup(
+            {"conclusion": "SUCCESS", "url": "a"},
+            {"conclusion": "STALE", "url": "b"},
+            {"conclusion": "STARTUP_FAILURE", "url": "c"},
+        )
+    )
+    assert status == ("failure", "c")
+    status = rollup_status(rollup({"conclusion": None, "url": "a"}))
+    assert status == ("pending", None)
+
+
+@pytest.mark.parametrize(
+    ("state", "expected"),
+    [
+        ("SUCCESS", "success"),
+        ("PENDING", "pending"),
+        ("EXPECTED", "pending"),
+        ("FAILURE", "failure"),
+        ("ERROR", "failure"),
+    ],
+)
+def test_rollup_status_contexts(state: str, expected: str) -> None:
+    status = rollup_status(
+        rollup({"state": state}, {"conclusion": "SUCCESS", "url": "a"})
+    )
+    assert status == (expected, None)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from dataclasses import dataclass
+
+import pytest
+
+from allprs.merger import MergeExecutor
+
+
+# The executor only looks at these
+@dataclass(frozen=True)
+class FakePr:
+    owner: str
+    repo: str
+    number: int
+    html_url: str = ""
+
+
+def test_one_action_per_repo_at_a_time() -> None:
+    running: dict[str, int] = {"a": 0, "b": 0}
+    most: dict[str, int] = {"a": 0, "b": 0}
+    order: list[tuple[str, int]] = []
+
+    async def action(pr: FakePr) -> bool:
+        running[pr.repo] += 1
+        most[pr.repo] = max(most[pr.repo], running[pr.repo])
+        order.append((pr.repo, pr.number))
+        await asyncio.sleep(0.01)
+        running[pr.repo] -= 1
+        return pr.number != 3
+
+    async def run() -> None:
+        executor = MergeExecutor(4)
+        task = asyncio.create_task(executor.run())
+        for number in range(5):
+            executor.submit(FakePr("o", "a", number), action)
+        executor.submit(FakePr("o", "b", 0), action)
+        await executor.join(lambda _progress: None)
+        assert executor.progress.done == 5
+        assert executor.progress.failed == 1
+        _ = task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+        # Stopped, so this would never run
+        with pytest.raises(RuntimeError):
+            executor.submit(FakePr("o", "a", 5), action)
+
+    asyncio.run(run())
+    assert most == {"a": 1, "b": 1}
+    # Repository b didn't wait for all of repository a
+    assert order.index(("b", 0)) < order.index(("a", 4))
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import re
+
+from allprs.policy import Rule, changed_files, changed_lines, decide, unquote
+from allprs.pr import Pr
+
+
+DIFF = """\
+diff --git a/package.json b/package.json
+index 1111111..2222222 100644
+--- a/package.json
++++ b/package.json
+@@ -1,3 +1,3 @@
+ {
+-  "version": "1.0.0"
++  "version": "1.0.1"
+ }
+diff --git a/bin/tool b/bin/tool
+index 3333333..4444444 100755
+Binary files a/bin/tool and b/bin/tool differ
+diff --git a/scripts/x.sh b/.github/workflows/x.yml
+similarity index 100%
+rename from scripts/x.sh
+rename to .github/workflows/x.yml
+diff --git a/run.sh b/run.sh
+old mode 100644
+new mode 100755
+"""
+
+
+def make_pr(author: str = "renovate[bot]", head_ref: str = "renovate/x") -> Pr:
+    return Pr(
+        owner="owner",
+        repo="repo",
+        number=1,
+        node_id="PR_1",
+        title="Update x",
+        author=author,
+        head_ref=head_ref,
+        head_sha="0" * 40,
+        head_owner="owner",
+        head_repo="repo",
+        html_url="https://github.com/owner/repo/pull/1",
+    )
+
+
+def test_changed_files() -> None:
+    assert changed_files(DIFF) == {
+        "package.json",
+        "bin/tool",
+        "scripts/x.sh",
+        ".github/workflows/x.yml",
+        "run.sh",
+    }
+
+
+def test_changed_files_path_with_b() -> None:
+    # Split in the middle, not at the first " b/"
+    diff = "diff --git a/x b/y b/x b/y\nnew file mode 100644\n"
+    assert changed_files(diff) == {"x b/y"}
+
+
+def test_changed_files_quoted() -> None:
+    diff = 'diff --git "a/caf\\303\\251 x" "b/caf\\303\\251 x"\nnew file mode 100644\n'
+    assert changed_files(diff) == {"café x"}
+
+
+def test_unquote() -> None:
+    assert unquote("plain/path") == "plain/path"
+    assert unquote('"tab\\there"') == "tab\there"
+    assert unquote('"caf\\303\\251"') == "café"
+
+
+def test_changed_lines() -> None:
+    assert changed_lines(DIFF) == 2
+
+
+def test_decide_first_match_wins() -> None:
+    rules = [
+        Rule("close", authors=["someone-else"]),
+        Rule("accept", authors=["renovate[bot]"]),
+        Rule("skip"),
+    ]
+    assert decide(rules, DIFF, [make_pr()]) == ("accept", 1)
+
+
+def test_decide_no_match() -> None:
+    assert decide([Rule("accept", max_diff_lines=1)], DIFF, [make_pr()]) == (
+        "skip",
+        None,
+    )
+
+
+def test_decide_files_needs_every_file() -> None:
+    # The binary, the rename and the mode change count as well
+    assert decide([Rule("accept", files=["package.json"])], DIFF, [make_pr()]) == (
+        "skip",
+        None,
+    )
+    rule = Rule("accept", files=["package.json", "bin/*", "scripts/*", "*.sh", ".*"])
+    assert decide([rule], DIFF, [make_pr()]) == ("accept", 0)
+
+
+def test_decide_every_pr_must_match() -> None:
+    rule = Rule("accept", head_branch_regex=re.compile(r"^renovate/"))
+    assert decide([rule], DIFF, [make_pr()]) == ("accept", 0)
+    assert decide([rule], DIFF, [make_pr(), make_pr(head_ref="other")]) == (
+        "skip",
+        None,
+    )
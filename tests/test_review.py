@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+
+from allprs.review import ReviewQueue
+
+
+WEIGHTS = {"prs": 1, "green": 10, "waiting": 0}
+
+
+# The queue only looks at the status, importing the real FullPr would load the config
+@dataclass
+class FakePr:
+    status: tuple[str, str | None]
+
+
+GREEN = FakePr(("success", None))
+PENDING = FakePr(("pending", None))
+
+
+def test_best_group_first() -> None:
+    queue = ReviewQueue(WEIGHTS)
+    queue.put([("small", "diff", [GREEN]), ("pending", "diff", [PENDING] * 5)])
+    queue.put([("big", "diff", [GREEN] * 3)])
+
+    async def titles() -> list[str]:
+        queue.close()
+        result = []
+        while (entry := await queue.get()) is not None:
+            result.append(entry.group[0])
+        return result
+
+    assert asyncio.run(titles()) == ["big", "small", "pending"]
+
+
+def test_take_title_group() -> None:
+    queue = ReviewQueue(WEIGHTS)
+    queue.put([("a", "1", [GREEN] * 3), ("a", "2", [GREEN]), ("a", "3", [PENDING])])
+    queue.put([("b", "1", [GREEN] * 2)])
+
+    async def run() -> None:
+        entry = await queue.get()
+        assert entry is not None
+        assert entry.group[:2] == ("a", "1")
+        taken = queue.take_title_group(entry)
+        assert sorted(diff for _title, diff, _prs in taken) == ["2", "3"]
+        queue.task_done()
+
+        # Only the other title group is left
+        entry = await queue.get()
+        assert entry is not None
+        assert entry.group[0] == "b"
+        assert not queue.heap
+        queue.task_done()
+        # The taken groups count as done as well
+        await asyncio.wait_for(queue.join(), 1)
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import itertools
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from allprs.search import format_created, owner_shards, split_created
+
+
+def test_owner_shards_single_owner() -> None:
+    query = "is:pr user:a author:app/renovate"
+    assert owner_shards(query) == [query]
+
+
+def test_owner_shards_multiple_owners() -> None:
+    assert owner_shards("is:pr user:a org:b author:@me") == [
+        "is:pr author:@me user:a",
+        "is:pr author:@me org:b",
+    ]
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7])
+def test_split_created(parts: int) -> None:
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    end = datetime(2024, 1, 2, tzinfo=UTC)
+    ranges = split_created((start, end), parts)
+    assert len(ranges) == parts
+    assert ranges[0][0] == start
+    assert ranges[-1][1] == end
+    # Contiguous, and the end of a range is included in it, so they don't overlap
+    for (_low, high), (next_low, _next_high) in itertools.pairwise(ranges):
+        assert next_low - high == timedelta(seconds=1)
+
+
+def test_split_created_more_parts_than_seconds() -> None:
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    end = start + timedelta(seconds=2)
+    ranges = split_created((start, end), 10)
+    assert ranges[0][0] == start
+    assert ranges[-1][1] == end
+    assert len(ranges) <= 2
+    assert all(low <= high for low, high in ranges)
+
+
+def test_format_created() -> None:
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    end = datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)
+    assert format_created((start, end)) == (
+        "created:2024-01-01T00:00:00Z..2024-01-02T03:04:05Z"
+    )